@@ -0,0 +1,92 @@
+"""Time the ledger analytics on a large synthetic ledger.
+
+    python benchmarks/bench_analytics.py [--rows 1000000] [--repeat 3]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.recurring_detector import RecurringDetector
+from utils.anomaly_detector import AnomalyDetector
+from utils.spending_forecaster import SpendingForecaster
+from utils.merchant_index import MerchantIndex
+
+
+def make_ledger(rows, seed=0):
+    """Synthetic ledger: a few monthly/weekly subscriptions on top of random spending."""
+    rng = np.random.default_rng(seed)
+    parts = []
+    for title, amount, freq in [('NETFLIX.COM 8668', 15.98, 'MS'), ('SPOTIFY P1234', 9.99, 'MS'),
+                                ('GOMO MOBILE SINGAPORE', 10.0, 'MS'), ('STEAMGAMES.COM 4259', 5.0, '7D')]:
+        dates = pd.date_range('2020-01-03', '2024-12-31', freq=freq)
+        parts.append(pd.DataFrame({'Date': dates, 'Title': title, 'Amount': amount, 'Category': 'Entertainment'}))
+
+    letters = np.array(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ'))
+    merchants = np.array([''.join(rng.choice(letters, 8)) + f' {i} SINGAPORE' for i in range(20000)])
+    parts.append(pd.DataFrame({
+        'Date': pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 1826, rows), unit='D'),
+        'Title': rng.choice(merchants, rows),
+        'Amount': rng.lognormal(3, 1, rows).round(2),
+        'Category': rng.choice(['Food & Dining', 'Shopping', 'Transportation', 'Groceries'], rows),
+    }))
+    df = pd.concat(parts, ignore_index=True).sample(frac=1, random_state=seed, ignore_index=True)
+    df.insert(0, 'ID', np.arange(1, len(df) + 1))
+    # Same in-memory shape as the loaded ledger
+    df['Date'] = df['Date'].dt.date
+    return df
+
+
+def timed(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return result, statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000, help='random transactions in the ledger')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per measurement; medians are reported')
+    args = parser.parse_args()
+
+    ledger = make_ledger(args.rows)
+    print(f"ledger: {len(ledger):,} rows")
+
+    detector = RecurringDetector()
+    subscriptions, seconds = timed(lambda: detector.detect(ledger), args.repeat)
+    print(f"recurring detection: {seconds * 1000:.0f} ms, {len(subscriptions)} subscriptions, "
+          f"${detector.monthly_recurring_cost(subscriptions):.2f}/month")
+
+    anomaly_detector = AnomalyDetector()
+    scores, seconds = timed(lambda: anomaly_detector.score(ledger), args.repeat)
+    print(f"anomaly scoring, full: {seconds * 1000:.0f} ms, {int(scores['Anomaly'].sum())} flagged")
+    # A saved statement: 100 new rows on top of the scored ledger
+    statement = make_ledger(100, seed=1).head(100).assign(ID=lambda d: d['ID'] + ledger['ID'].max())
+    grown = pd.concat([ledger, statement], ignore_index=True)
+    _, seconds = timed(lambda: anomaly_detector.score(grown, scores), args.repeat)
+    print(f"anomaly scoring, +100 rows incremental: {seconds * 1000:.0f} ms")
+
+    forecast, seconds = timed(lambda: SpendingForecaster().forecast(ledger), args.repeat)
+    print(f"forecast: {seconds * 1000:.0f} ms, {len(forecast)} categories")
+
+    index, seconds = timed(lambda: MerchantIndex.build(ledger), args.repeat)
+    print(f"search index build: {seconds * 1000:.0f} ms, {len(index.tokens):,} tokens")
+    index.search('xq', fuzzy=True)  # Builds the trigram table once
+    for query, fuzzy in [('netf', False), ('gomo mob', False), ('netflx', True)]:
+        ids, seconds = timed(lambda: index.search(query, fuzzy), max(args.repeat, 100))
+        print(f"search {query!r}{' (fuzzy)' if fuzzy else ''}: {seconds * 1000:.3f} ms, {len(ids)} rows")
+    _, seconds = timed(lambda: index.add(statement['ID'], statement['Title']), 1)
+    print(f"search index, +100 rows incremental: {seconds * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Compare the learned categorizer with the keyword matcher on throughput and accuracy.
+
+    python benchmarks/bench_categorizer.py [--ledger data/final_expenses.csv] [--rows 200000] [--repeat 3]
+
+The ledger is split by date: the model is trained on the oldest 80% of rows and both
+categorizers are scored on the newest 20%, like a new statement after months of use.
+Without --ledger a synthetic ledger with Zipf-distributed merchants is used.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.ledger_store import LedgerStore
+from utils.pdf_processor import PDFProcessor
+from utils.learned_categorizer import LearnedCategorizer
+
+CATEGORIES = ['Food & Dining', 'Transportation', 'Shopping', 'Utilities', 'Healthcare',
+              'Entertainment', 'Groceries', 'Banking']
+# A few merchants the keyword lists know, so the matcher gets some right
+KNOWN_MERCHANTS = [('STARBUCKS', 'Food & Dining'), ('GRAB*', 'Transportation'), ('SHOPEE SINGAPORE', 'Shopping'),
+                   ('GOMO MOBILE', 'Utilities'), ('GUARDIAN PHARMACY', 'Healthcare'), ('NETFLIX.COM', 'Entertainment'),
+                   ('COLD STORAGE', 'Groceries'), ('ATM WITHDRAWAL', 'Banking')]
+
+
+def make_ledger(rows, seed=0):
+    """Synthetic ledger: merchants with branch/reference numbers, a stable category each and 2% label noise."""
+    rng = np.random.default_rng(seed)
+    letters = np.array(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ'))
+    names = [''.join(rng.choice(letters, rng.integers(4, 10))) + ' ' + ''.join(rng.choice(letters, 3)) for _ in range(5000)]
+    names += [name for name, _ in KNOWN_MERCHANTS]
+    labels = list(rng.choice(CATEGORIES, 5000)) + [category for _, category in KNOWN_MERCHANTS]
+
+    # Popular merchants show up much more often
+    merchant = np.minimum(rng.zipf(1.3, rows) - 1, len(names) - 1)
+    merchant = np.where(rng.random(rows) < 0.2, len(names) - 1 - rng.integers(0, len(KNOWN_MERCHANTS), rows), merchant)
+    suffixes = np.array(['', ' SINGAPORE', ' SG', ' 0123', ' P1234'])
+    titles = np.char.add(np.asarray(names, dtype=str)[merchant], rng.choice(suffixes, rows))
+    categories = np.asarray(labels, dtype=object)[merchant]
+    noisy = rng.random(rows) < 0.02
+    categories[noisy] = rng.choice(CATEGORIES, noisy.sum())
+
+    return pd.DataFrame({
+        'ID': np.arange(1, rows + 1),
+        'Date': (pd.Timestamp('2020-01-01') + pd.to_timedelta(np.sort(rng.integers(0, 1826, rows)), unit='D')).date,
+        'Title': titles.astype(object),
+        'Amount': rng.lognormal(3, 1, rows).round(2),
+        'Category': categories,
+    })
+
+
+def timed(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return result, statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ledger', help='ledger CSV to evaluate on instead of synthetic data')
+    parser.add_argument('--rows', type=int, default=200_000, help='rows in the synthetic ledger')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per measurement; medians are reported')
+    args = parser.parse_args()
+
+    ledger = LedgerStore(args.ledger).load() if args.ledger else make_ledger(args.rows)
+    ledger = ledger.sort_values(['Date', 'ID'], ignore_index=True)
+    split = int(len(ledger) * 0.8)
+    train, test = ledger.iloc[:split], ledger.iloc[split:]
+    print(f"ledger: {len(ledger):,} rows, train {len(train):,}, test {len(test):,}")
+
+    processor = PDFProcessor()
+    keyword, seconds = timed(lambda: processor.categorize_series(test['Title']), args.repeat)
+    print(f"keyword matcher: {(keyword == test['Category']).mean():.1%} accurate, {len(test) / seconds:,.0f} rows/s")
+
+    model, seconds = timed(lambda: LearnedCategorizer.from_ledger(train), args.repeat)
+    print(f"training: {seconds * 1000:.0f} ms ({len(train) / seconds:,.0f} rows/s)")
+
+    (learned, confidence), seconds = timed(lambda: model.predict(test['Title']), args.repeat)
+    print(f"learned model: {(learned == test['Category']).mean():.1%} accurate, {len(test) / seconds:,.0f} rows/s")
+
+    combined, seconds = timed(lambda: processor.categorize_series(test['Title'], model), args.repeat)
+    print(f"keywords + learned fallback: {(combined == test['Category']).mean():.1%} accurate, "
+          f"{len(test) / seconds:,.0f} rows/s")
+
+    # Saving a statement: learn 100 rows incrementally instead of retraining
+    statement = test.head(100)
+    _, seconds = timed(lambda: model.partial_fit(statement['Title'], statement['Category']), args.repeat)
+    print(f"incremental update, 100 rows: {seconds * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Time loading a large ledger CSV: pandas type inference vs the typed, chunked Arrow loader.
+
+Covers a current ledger and a legacy one (only Date, Title, Amount and Category, as
+early versions saved), the cold load that streams the CSV into the Arrow sidecar,
+the warm load that maps it, and the size of a snapshot as CSV vs compressed Arrow.
+
+    python benchmarks/bench_load.py [--rows 1000000] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_analytics import make_ledger, timed
+from utils.ledger_store import LedgerStore
+
+
+def cold_load(store):
+    """Load with no sidecar, as the first session after the CSV changed does."""
+    if os.path.exists(store.arrow_path):
+        os.remove(store.arrow_path)
+    return store.load()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000, help='random transactions in the ledger')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per measurement; medians are reported')
+    args = parser.parse_args()
+
+    df = make_ledger(args.rows)
+    df['Manual'] = False
+    with tempfile.TemporaryDirectory() as directory:
+        current = LedgerStore(os.path.join(directory, 'current.csv'))
+        current.write(df, {'op': 'reset'})
+        legacy = LedgerStore(os.path.join(directory, 'legacy.csv'))
+        df[['Date', 'Title', 'Amount', 'Category']].to_csv(legacy.expense_file_path, index=False)
+
+        print(f"{len(df)} rows, CSV {os.path.getsize(current.expense_file_path) / 1e6:.1f} MB")
+        print(f"{'ledger':<10}{'pandas read_csv (ms)':>22}{'typed cold (ms)':>17}{'mapped warm (ms)':>18}")
+        for label, store in [('current', current), ('legacy', legacy)]:
+            _, before = timed(lambda: LedgerStore._normalize(pd.read_csv(store.expense_file_path)), args.repeat)
+            _, cold = timed(lambda: cold_load(store), args.repeat)
+            _, warm = timed(store.load, args.repeat)
+            print(f"{label:<10}{before * 1000:>22.0f}{cold * 1000:>17.0f}{warm * 1000:>18.0f}")
+
+        _, probe_before = timed(lambda: pd.read_csv(current.expense_file_path), args.repeat)
+        _, probe_after = timed(lambda: pd.read_csv(current.expense_file_path, nrows=1), args.repeat)
+        print(f"session start file probe: {probe_before * 1000:.0f} ms -> {probe_after * 1000:.1f} ms")
+
+        snapshot_csv = current.base_path + '2020-01-01_00-00-00.csv'
+        df.to_csv(snapshot_csv, index=False)
+        _, snapshot_csv_write = timed(lambda: df.to_csv(snapshot_csv, index=False), args.repeat)
+        csv_bytes = os.path.getsize(snapshot_csv)
+        result = current.migrate()
+        _, snapshot_arrow_write = timed(lambda: current._write_snapshot(df), args.repeat)
+        print(f"snapshot: CSV {csv_bytes / 1e6:.1f} MB, {snapshot_csv_write * 1000:.0f} ms -> "
+              f"zstd Arrow {result['arrow_bytes'] / 1e6:.1f} MB, {snapshot_arrow_write * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Measure cold-start and rerun latency of the Streamlit pages.
+
+Each page runs in a fresh interpreter through Streamlit's AppTest harness, so the
+first run includes every module import the page triggers. Reruns reuse the
+imported modules and cached resources, like a user interacting with the page.
+
+    python benchmarks/bench_startup.py [--rows 1000] [--reruns 10] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs inside the child interpreter with the temporary ledger directory as cwd
+CHILD = """
+import json, sys, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+harness = time.perf_counter() - t0
+baseline_modules = set(sys.modules)
+
+app = AppTest.from_file({page!r}, default_timeout=120)
+app.session_state['file_password'] = 'benchmark'
+t0 = time.perf_counter()
+app.run()
+first_run = time.perf_counter() - t0
+heavy = sorted(m for m in ('plotly.express', 'plotly.graph_objects', 'pymupdf4llm', 'pymupdf') if m in sys.modules and m not in baseline_modules)
+
+reruns = []
+for _ in range({reruns}):
+    t0 = time.perf_counter()
+    app.run()
+    reruns.append(time.perf_counter() - t0)
+print(json.dumps({{'harness': harness, 'first_run': first_run, 'reruns': reruns, 'heavy_imports': heavy,
+                   'errors': [str(e.value) for e in app.exception]}}))
+"""
+
+
+def write_ledger(directory, rows):
+    """Write a synthetic ledger so the Analysis page renders its charts."""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    titles = ['NETFLIX.COM', 'GRAB RIDE', 'KOUFU', 'GOMO MOBILE', 'SHOPEE', 'COLD STORAGE', 'SPOTIFY']
+    df = pd.DataFrame({
+        'Date': pd.to_datetime('2023-01-01') + pd.to_timedelta(rng.integers(0, 600, rows), unit='D'),
+        'Title': rng.choice(titles, rows),
+        'Amount': rng.uniform(1, 200, rows).round(2),
+        'Category': 'Other',
+    })
+    df['Date'] = df['Date'].dt.strftime('%Y-%m-%d')
+    os.makedirs(os.path.join(directory, 'data'), exist_ok=True)
+    df.to_csv(os.path.join(directory, 'data', 'final_expenses.csv'), index=False)
+
+
+def run_page(page, directory, reruns):
+    code = CHILD.format(page=os.path.join(REPO_ROOT, 'pages', page), reruns=reruns)
+    out = subprocess.run([sys.executable, '-c', code], cwd=directory, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000, help='rows in the synthetic ledger')
+    parser.add_argument('--reruns', type=int, default=10, help='reruns to time after the first run')
+    parser.add_argument('--repeat', type=int, default=5, help='fresh interpreters per scenario; medians are reported')
+    args = parser.parse_args()
+
+    scenarios = [
+        ('1-BankStatements.py', 'no upload', 0),
+        ('2-Analysis.py', 'empty ledger', 0),
+        ('2-Analysis.py', f'{args.rows} rows', args.rows),
+    ]
+    print(f"{'page':<22}{'scenario':<14}{'cold run (ms)':>15}{'rerun p50 (ms)':>16}  heavy imports")
+    for page, label, rows in scenarios:
+        with tempfile.TemporaryDirectory() as directory:
+            if rows:
+                write_ledger(directory, rows)
+            results = [run_page(page, directory, args.reruns) for _ in range(args.repeat)]
+        errors = [error for result in results for error in result['errors']]
+        if errors:
+            print(f"{page}: {errors[0]}", file=sys.stderr)
+        cold = statistics.median(result['first_run'] for result in results)
+        rerun = statistics.median(t for result in results for t in result['reruns'])
+        print(f"{page:<22}{label:<14}{cold * 1000:>15.1f}{rerun * 1000:>16.1f}  {', '.join(results[0]['heavy_imports']) or '-'}")
+
+if __name__ == '__main__':
+    main()
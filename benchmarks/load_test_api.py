@@ -0,0 +1,171 @@
+"""Load-test the local ledger API with concurrent readers and a bulk importer.
+
+Without --url, a server is started on a synthetic ledger in a temporary directory
+(`python -m utils.api_server`) and stopped afterwards. Readers hit the query and
+summary endpoints over keep-alive connections while one writer imports batches of
+new rows, so cached responses are invalidated during the run.
+
+    python benchmarks/load_test_api.py [--rows 100000] [--clients 32] [--duration 10] [--url http://127.0.0.1:8765]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_analytics import make_ledger
+from utils.ledger_store import LedgerStore
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+READ_TARGETS = [
+    '/summary',
+    '/summary/categories',
+    '/expenses?limit=50',
+    '/expenses?start=2024-01-01&end=2024-03-31&limit=100',
+    '/expenses?category=Groceries&min_amount=50&limit=100',
+    '/expenses?q=netflix&limit=20',
+    '/expenses?q=spotfy&fuzzy=true&limit=20',
+]
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection."""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def request(self, method, target, body=b''):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        headers = f"{method} {target} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+        self.writer.write(headers.encode('latin-1') + body)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if not line.strip():
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.strip().lower() == 'content-length':
+                length = int(value)
+        return status, await self.reader.readexactly(length)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def reader_client(host, port, deadline, latencies, errors):
+    connection = Connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            target = random.choice(READ_TARGETS)
+            start = time.perf_counter()
+            status, _ = await connection.request('GET', target)
+            latencies.setdefault(target.split('?')[0], []).append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(f"GET {target}: {status}")
+    finally:
+        connection.close()
+
+
+async def writer_client(host, port, deadline, batch, latencies, errors):
+    connection = Connection(host, port)
+    sequence = 0
+    try:
+        while time.perf_counter() < deadline:
+            rows = [{'Date': '2025-01-15', 'Title': f'LOAD TEST MERCHANT {sequence} {i}', 'Amount': 10 + i % 50, 'Category': 'Shopping'}
+                    for i in range(batch)]
+            sequence += 1
+            start = time.perf_counter()
+            status, body = await connection.request('POST', '/expenses/import', json.dumps(rows).encode())
+            latencies.setdefault('/expenses/import', []).append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(f"POST /expenses/import: {status} {body[:200]}")
+            await asyncio.sleep(0.5)
+    finally:
+        connection.close()
+
+
+async def run_load(host, port, clients, duration, batch):
+    latencies, errors = {}, []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(
+        writer_client(host, port, deadline, batch, latencies, errors),
+        *[reader_client(host, port, deadline, latencies, errors) for _ in range(clients)]
+    )
+    return latencies, errors
+
+
+def start_server(directory, rows):
+    """Write a synthetic ledger and start a server on it; returns (process, port)."""
+    df = make_ledger(rows)
+    df['Manual'] = False
+    ledger_path = os.path.join(directory, 'final_expenses.csv')
+    LedgerStore(ledger_path).write(df, {'op': 'reset'})
+
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    process = subprocess.Popen([sys.executable, '-m', 'utils.api_server', '--ledger', ledger_path, '--port', str(port)],
+                               cwd=REPO_ROOT, stdout=subprocess.DEVNULL)
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process, port
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("API server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='running server to test instead of starting one')
+    parser.add_argument('--rows', type=int, default=100_000, help='random transactions in the synthetic ledger')
+    parser.add_argument('--clients', type=int, default=32, help='concurrent reading connections')
+    parser.add_argument('--duration', type=float, default=10, help='seconds to run')
+    parser.add_argument('--batch', type=int, default=100, help='rows per bulk import')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        process = None
+        if args.url:
+            url = urlsplit(args.url)
+            host, port = url.hostname, url.port or 80
+        else:
+            process, port = start_server(directory, args.rows)
+            host = '127.0.0.1'
+        try:
+            latencies, errors = asyncio.run(run_load(host, port, args.clients, args.duration, args.batch))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    total = sum(len(times) for times in latencies.values())
+    print(f"{args.clients} readers + 1 importer for {args.duration:.0f}s: {total} requests, {total / args.duration:.0f} req/s, {len(errors)} errors")
+    print(f"{'endpoint':<22}{'requests':>10}{'p50 (ms)':>10}{'p95 (ms)':>10}{'p99 (ms)':>10}")
+    for endpoint, times in sorted(latencies.items()):
+        times = sorted(times)
+        p95, p99 = times[int(len(times) * 0.95)], times[min(int(len(times) * 0.99), len(times) - 1)]
+        print(f"{endpoint:<22}{len(times):>10}{statistics.median(times) * 1000:>10.2f}{p95 * 1000:>10.2f}{p99 * 1000:>10.2f}")
+    if errors:
+        print(f"first error: {errors[0]}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
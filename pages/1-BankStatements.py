@@ -8,13 +8,11 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.data_manager import DataManager
-from utils.pdf_processor import PDFProcessor
+from utils.pdf_processor import get_pdf_processor
+from utils.fx_rates import FxRates
 
 st.set_page_config(page_title="Upload & Process", page_icon="📤", layout="wide")
 
-# Initialize PDF processor
-pdf_processor = PDFProcessor()
-
 st.title("📤 Upload & Process Bank Statement (only citibank)")
 
 # File path configuration at the top
@@ -47,6 +45,8 @@ if 'data_manager' not in st.session_state or st.session_state.get('expense_file_
     st.session_state.data_manager = DataManager(expense_file_path)
 
 data_manager = st.session_state.data_manager
+# The manager is kept across reruns, so poll for rows other sessions saved since the last one
+data_manager.sync_changes()
 
 # Display current file info
 file_info = data_manager.get_file_info()
@@ -55,6 +55,42 @@ if file_info['file_exists']:
 else:
     st.warning(f"📄 New file will be created: {file_info['file_path']}")
 
+# Ledgers saved by older versions: untyped CSV and a full CSV snapshot per save
+if file_info.get('needs_migration'):
+    col_a, col_b = st.columns([3, 1])
+    with col_a:
+        st.warning("🗜️ This ledger has files in an older format. Migrate once to load faster and shrink saved snapshots.")
+    with col_b:
+        if st.button("🗜️ Migrate Ledger Files"):
+            with st.spinner("Migrating ledger files..."):
+                result = data_manager.migrate_ledger()
+            if result is not None:
+                st.success(f"Converted {result['snapshots']} snapshots: "
+                           f"{result['csv_bytes'] / 1e6:.1f} MB → {result['arrow_bytes'] / 1e6:.1f} MB")
+
+# Accounts: several ledgers (cards, household members) analyzed together on the Analysis page
+with st.expander("🏦 Accounts"):
+    registered_accounts = data_manager.registry.accounts()
+    if registered_accounts:
+        st.dataframe(pd.DataFrame({'Account': list(registered_accounts), 'Ledger File': list(registered_accounts.values())}),
+                     use_container_width=True, hide_index=True)
+    else:
+        st.caption("No accounts registered yet. Register this file to analyze several ledgers together.")
+
+    col_a, col_b = st.columns(2)
+    with col_a:
+        account_name = st.text_input("Account name for this file:", value=data_manager.get_active_account())
+        if st.button("➕ Register Account"):
+            if data_manager.register_account(account_name):
+                st.success(f"Registered {expense_file_path} as '{account_name.strip()}'!")
+                st.rerun()
+    with col_b:
+        if registered_accounts:
+            account_to_remove = st.selectbox("Registered account:", options=list(registered_accounts))
+            if st.button("➖ Remove Account"):
+                if data_manager.unregister_account(account_to_remove):
+                    st.rerun()
+
 st.divider()
 
 # Main content
@@ -67,7 +103,7 @@ with col1:
     if uploaded_file is not None:
         if st.button("Extract Expenses", type="primary"):
             with st.spinner("Processing PDF..."):
-                extracted_expenses = pdf_processor.extract_expenses_from_pdf(uploaded_file)
+                extracted_expenses = get_pdf_processor().extract_expenses_from_pdf(uploaded_file, data_manager.get_categorizer())
                 if extracted_expenses:
                     data_manager.set_current_expenses(pd.DataFrame(extracted_expenses))
                     st.success(f"Extracted {len(extracted_expenses)} expenses!")
@@ -90,11 +126,12 @@ with col2:
 current_expenses = data_manager.get_current_expenses()
 if not current_expenses.empty:
     st.header("📋 Preview & Edit Expenses")
+    editor_key = f"expense_editor_{data_manager.get_current_expenses_version()}"
     
     # Add new expense manually
     with st.expander("➕ Add New Expense"):
         with st.form("add_expense_form"):
-            col1, col2, col3, col4 = st.columns(4)
+            col1, col2, col3, col4, col5 = st.columns(5)
             with col1:
                 new_date = st.date_input("Date", value=date.today())
             with col2:
@@ -102,6 +139,9 @@ if not current_expenses.empty:
             with col3:
                 new_amount = st.number_input("Amount", min_value=0.00, step=0.01)
             with col4:
+                # Amounts in other currencies are converted with the FX rate table for analysis
+                new_currency = st.selectbox("Currency", FxRates.load().currencies())
+            with col5:
                 categories = ['Food & Dining', 'Transportation', 'Shopping', 'Utilities', 
                             'Healthcare', 'Entertainment', 'Groceries', 'Other']
                 new_category = st.selectbox("Category", categories)
@@ -113,9 +153,13 @@ if not current_expenses.empty:
                     'Date': [new_date],
                     'Title': [new_title],
                     'Amount': [new_amount],
-                    'Category': [new_category]
+                    'Category': [new_category],
+                    'Manual': [True],
+                    'Currency': [new_currency]
                 })
-                updated_expenses = pd.concat([current_expenses, new_expense], ignore_index=True)
+                # Keep edits already made in the table below
+                pending_expenses = data_manager.apply_expense_edits(st.session_state.get(editor_key))
+                updated_expenses = pd.concat([pending_expenses, new_expense], ignore_index=True)
                 data_manager.set_current_expenses(updated_expenses)
                 st.success("Expense added!")
                 st.rerun()
@@ -123,13 +167,10 @@ if not current_expenses.empty:
     # Display and edit expenses with better state management
     st.subheader("Edit Expenses")
     
-    # Initialize edited expenses in session state only once
-    if f"edited_expenses_{id(current_expenses)}" not in st.session_state:
-        st.session_state[f"edited_expenses_{id(current_expenses)}"] = current_expenses.copy()
-    
-    # Use a unique key for the data editor to prevent conflicts
-    edited_df = st.data_editor(
-        st.session_state[f"edited_expenses_{id(current_expenses)}"],
+    # The editor keeps only the edit delta in session state; the key changes whenever
+    # current expenses are replaced so stale edits are discarded
+    st.data_editor(
+        current_expenses,
         column_config={
             "Date": st.column_config.DateColumn("Date"),
             "Title": st.column_config.TextColumn("Title"),
@@ -138,16 +179,19 @@ if not current_expenses.empty:
                 "Category",
                 options=['Food & Dining', 'Transportation', 'Shopping', 'Utilities', 
                         'Healthcare', 'Entertainment', 'Groceries', 'Other']
-            )
+            ),
+            "Manual": None,
+            "Currency": st.column_config.TextColumn("Currency", disabled=True),
+            "Original Currency": st.column_config.TextColumn("Original Currency", disabled=True),
+            "Original Amount": st.column_config.NumberColumn("Original Amount", format="%.2f", disabled=True),
+            # Positions used to link conversion fees to their foreign charge when saving
+            "Row": None,
+            "Parent Row": None
         },
         num_rows="dynamic",
         use_container_width=True,
-        key=f"expense_editor_{id(current_expenses)}"
+        key=editor_key
     )
-
-    # # Update session state only when there are actual changes
-    # if not edited_df.equals(st.session_state[f"edited_expenses_{id(current_expenses)}"]):
-    #     st.session_state[f"edited_expenses_{id(current_expenses)}"] = edited_df
     
     # Save buttons with form to prevent unnecessary reruns
     col1, col2, col3 = st.columns(3)
@@ -156,19 +200,11 @@ if not current_expenses.empty:
             save_button = st.form_submit_button("✅ Confirm & Save Expenses", type="primary", use_container_width=True)
             
             if save_button:
-                # Update session state only when there are actual changes
-                if not edited_df.equals(st.session_state[f"edited_expenses_{id(current_expenses)}"]):
-                    st.session_state[f"edited_expenses_{id(current_expenses)}"] = edited_df
-                current_edited = st.session_state[f"edited_expenses_{id(current_expenses)}"]
-                success = data_manager.save_expenses_to_final(current_edited)
+                success = data_manager.save_expense_edits(st.session_state.get(editor_key))
                 
                 if success:
                     # Clear states
                     data_manager.clear_current_expenses()
-                    # Clean up old session state keys
-                    keys_to_remove = [key for key in st.session_state.keys() if key.startswith("edited_expenses_")]
-                    for key in keys_to_remove:
-                        del st.session_state[key]
                     st.success("Expenses saved successfully!")
                     st.rerun()
                 else:
@@ -194,5 +230,16 @@ if not final_expenses.empty:
             st.metric("Count", summary['transaction_count'])
         with col4:
             st.metric("Top Category", summary['top_category'])
+    
+    # Re-apply category rules after keywords are added to the processor
+    if st.button("🔁 Recategorize Saved Expenses", help="Apply the current category rules to all saved expenses, keeping categories you picked by hand"):
+        with st.spinner("Recategorizing..."):
+            changes = data_manager.recategorize_expenses(get_pdf_processor())
+        if changes is not None:
+            if changes.empty:
+                st.info("All saved expenses already match the current category rules.")
+            else:
+                st.success(f"Recategorized {int(changes['Changed'].sum())} expenses!")
+                st.dataframe(changes, use_container_width=True)
 else:
     st.info("No final expenses saved yet. Process and confirm some expenses first!")
\ No newline at end of file
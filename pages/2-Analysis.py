@@ -1,7 +1,5 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import date, timedelta
 import sys
 import os
@@ -10,6 +8,10 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.data_manager import DataManager
+from utils.recurring_detector import RecurringDetector
+from utils.anomaly_detector import AnomalyDetector
+from utils.spending_forecaster import SpendingForecaster
+from utils.fx_rates import FxRates, FX_RATES_PATH
 
 st.set_page_config(page_title="Expense Analysis", page_icon="📊", layout="wide")
 
@@ -19,13 +21,46 @@ data_manager = DataManager(expense_file_path)
 
 st.title("📊 Expense Analysis Dashboard")
 
-final_expenses = data_manager.get_final_expenses()
+# Registered accounts are analyzed together; per-account filtering happens in the sidebar
+accounts = list(data_manager.get_accounts())
+if len(accounts) > 1:
+    st.sidebar.header("🏦 Accounts")
+    selected_accounts = st.sidebar.multiselect("Select Accounts", options=accounts, default=accounts)
+else:
+    selected_accounts = accounts
+# Accounts whose ledger can't be loaded are skipped with a warning
+selected_accounts = data_manager.get_loaded_accounts(selected_accounts)
+
+final_expenses = data_manager.get_unified_expenses(selected_accounts)
 
-if final_expenses.empty:
+if not selected_accounts:
+    st.info("Select at least one account to analyze.")
+elif final_expenses.empty:
     st.info("No expense data available. Please upload and process a bank statement first.")
     st.markdown("👈 Use the **Upload & Process** page to get started!")
 else:
+    # Plotly is slow to import, so only load it once there is data to chart
+    import plotly.express as px
+    
     df = final_expenses.copy()
+    
+    missing_fx_rates = final_expenses.attrs.get('missing_fx_rates')
+    if missing_fx_rates:
+        st.warning(f"💱 {sum(missing_fx_rates.values())} expenses in {', '.join(sorted(missing_fx_rates))} are left out: "
+                   f"there is no FX rate for their currency and date in {FX_RATES_PATH}.")
+    
+    # Anomaly scores are kept per account and ledger version; after a save only the new rows are scored
+    anomaly_detector = AnomalyDetector()
+    anomaly_scores = pd.concat([
+        data_manager.cached_for_ledger(
+            'anomalies',
+            lambda ledger: anomaly_detector.score(ledger, data_manager.previous_ledger_result('anomalies', [account])),
+            [account]
+        ).assign(Account=account)
+        for account in selected_accounts
+    ], ignore_index=True)
+    df = df.merge(anomaly_scores[['Account', 'ID', 'Baseline', 'Anomaly Score', 'Anomaly']], on=['Account', 'ID'], how='left')
+    df['Anomaly'] = df['Anomaly'].fillna(False).astype(bool)
     df['Date'] = pd.to_datetime(df['Date'])
     df['Month'] = df['Date'].dt.to_period('M')
     df['Year'] = df['Date'].dt.year
@@ -63,6 +98,13 @@ else:
         step=1.0
     )
     
+    # Merchant search, backed by the ledger's search index
+    search_query = st.sidebar.text_input(
+        "🔎 Search Merchant",
+        help="Matches words starting with what you type, e.g. 'net' finds NETFLIX"
+    )
+    fuzzy_search = st.sidebar.checkbox("Fuzzy Match", help="Also match similar spellings, e.g. 'netflx'")
+    
     # Filter data
     if len(date_range) == 2:
         mask = (df['Date'].dt.date >= date_range[0]) & (df['Date'].dt.date <= date_range[1])
@@ -76,6 +118,14 @@ else:
         (filtered_df['Amount'] <= amount_range[1])
     ]
     
+    # Apply merchant search (IDs are only unique within an account); queries with no searchable word don't filter
+    if search_query.strip():
+        account_matches = {account: data_manager.search_expenses(search_query, fuzzy_search, account) for account in selected_accounts}
+        if all(ids is not None for ids in account_matches.values()):
+            matches = pd.concat([pd.DataFrame({'Account': account, 'ID': ids}) for account, ids in account_matches.items()])
+            row_keys = pd.MultiIndex.from_frame(filtered_df[['Account', 'ID']])
+            filtered_df = filtered_df[row_keys.isin(pd.MultiIndex.from_frame(matches))]
+    
     if filtered_df.empty:
         st.warning("No data matches your current filters. Please adjust the filter criteria.")
     else:
@@ -202,6 +252,15 @@ else:
             fig_hbar.update_layout(yaxis={'categoryorder':'total ascending'})
             st.plotly_chart(fig_hbar, use_container_width=True)
         
+        # Expenses by Account (only when several accounts are analyzed together)
+        if filtered_df['Account'].nunique() > 1:
+            st.subheader("🏦 Expenses by Account")
+            account_monthly = filtered_df.groupby([filtered_df['Month'].astype(str), 'Account'])['Amount'].sum().reset_index()
+            fig_accounts = px.bar(account_monthly, x='Month', y='Amount', color='Account',
+                                  title="Monthly Expenses per Account",
+                                  labels={'Amount': 'Expenses ($)'})
+            st.plotly_chart(fig_accounts, use_container_width=True)
+        
         # Detailed Analysis Section
         st.header("🔍 Detailed Analysis")
         
@@ -267,6 +326,101 @@ else:
         else:
             st.info("Monthly breakdown requires data from multiple months.")
         
+        # Next Month Forecast (fitted on the selected accounts' ledgers once per ledger version)
+        st.subheader("🔮 Next Month Forecast")
+        forecast = data_manager.cached_for_ledger('forecast', SpendingForecaster().forecast, selected_accounts)
+        forecast = forecast[forecast['Category'].isin(categories)]
+        
+        if forecast.empty:
+            st.info("No categories selected to forecast.")
+        else:
+            forecast_month = forecast['Month'].iloc[0]
+            total_forecast = forecast['Forecast'].sum()
+            total_last = forecast['Last Month'].sum()
+            col_a, col_b = st.columns(2)
+            with col_a:
+                st.metric(f"Projected Spend ({forecast_month})", f"${total_forecast:.2f}",
+                          f"{total_forecast - total_last:+.2f} vs latest month", delta_color="inverse")
+            with col_b:
+                st.metric("Categories Forecast", len(forecast))
+            
+            forecast_chart = forecast.melt(id_vars='Category', value_vars=['Last Month', 'Forecast'],
+                                           var_name='Series', value_name='Amount')
+            fig_forecast = px.bar(forecast_chart, x='Category', y='Amount', color='Series', barmode='group',
+                                  title=f"Latest Month vs Forecast for {forecast_month}",
+                                  labels={'Amount': 'Expenses ($)'})
+            st.plotly_chart(fig_forecast, use_container_width=True)
+            
+            with st.expander("Forecast details"):
+                details = forecast.copy()
+                details['Month'] = details['Month'].astype(str)
+                st.dataframe(details, use_container_width=True, hide_index=True)
+        
+        # Unusual Transactions
+        st.subheader("🚨 Unusual Transactions")
+        anomalies = filtered_df[filtered_df['Anomaly']].sort_values('Anomaly Score', ascending=False)
+        if anomalies.empty:
+            st.info("No unusual transactions in the selected data.")
+        else:
+            st.caption(f"{len(anomalies)} transactions are well above the usual amount for their merchant or category.")
+            unusual = anomalies[['Date', 'Title', 'Amount', 'Baseline', 'Anomaly Score', 'Category']].copy()
+            unusual['Date'] = unusual['Date'].dt.strftime('%Y-%m-%d')
+            st.dataframe(unusual, use_container_width=True, hide_index=True)
+        
+        # Recurring Charges (selected accounts' ledgers, recomputed only when they change)
+        st.subheader("🔁 Recurring Charges & Subscriptions")
+        detector = RecurringDetector()
+        subscriptions = data_manager.cached_for_ledger('subscriptions', detector.detect, selected_accounts)
+        
+        if subscriptions.empty:
+            st.info("No recurring charges detected yet. They show up after three or more regular charges from the same merchant.")
+        else:
+            col_a, col_b = st.columns(2)
+            with col_a:
+                st.metric("Projected Monthly Recurring Cost", f"${detector.monthly_recurring_cost(subscriptions):.2f}")
+            with col_b:
+                st.metric("Active Subscriptions", int(subscriptions['Active'].sum()))
+            st.dataframe(subscriptions, use_container_width=True, hide_index=True)
+        
+        # Foreign Currency Charges, with the conversion fees linked to each of them
+        foreign = filtered_df[filtered_df['Original Currency'].notna()]
+        if not foreign.empty:
+            st.subheader("💱 Foreign Currency Charges")
+            # Fees count toward their charge even when the filters leave them out
+            fees = df[df['Parent ID'].notna()]
+            fee_totals = fees.groupby(['Account', fees['Parent ID'].astype('int64').rename('ID')])['Amount'].sum().rename('Fee').reset_index()
+            foreign = foreign.merge(fee_totals, on=['Account', 'ID'], how='left')
+            foreign['Fee'] = foreign['Fee'].fillna(0.0)
+            foreign['At Table Rate'] = FxRates.load().to_base(foreign['Original Amount'], foreign['Original Currency'], foreign['Date'])
+            
+            foreign_total = foreign['Amount'].sum()
+            fee_total = foreign['Fee'].sum()
+            col_a, col_b, col_c = st.columns(3)
+            with col_a:
+                st.metric("Foreign Spend", f"${foreign_total:.2f}")
+            with col_b:
+                st.metric("Conversion Fees", f"${fee_total:.2f}")
+            with col_c:
+                st.metric("Fees vs Foreign Spend", f"{fee_total / foreign_total * 100:.2f}%" if foreign_total else "-")
+            
+            by_currency = foreign.groupby('Original Currency').agg(
+                Charges=('ID', 'count'),
+                Original=('Original Amount', 'sum'),
+                Charged=('Amount', 'sum'),
+                Fees=('Fee', 'sum'),
+                AtTableRate=('At Table Rate', 'sum')
+            )
+            by_currency['Effective Rate'] = ((by_currency['Charged'] + by_currency['Fees']) / by_currency['Original']).round(4)
+            # Rates are only known where the FX rate table covers the currency and dates
+            table_amount = by_currency['AtTableRate'].where(by_currency['AtTableRate'] > 0)
+            by_currency['Table Rate'] = (table_amount / by_currency['Original']).round(4)
+            by_currency['Markup (%)'] = ((by_currency['Charged'] + by_currency['Fees']) / table_amount * 100 - 100).round(2)
+            by_currency = by_currency.drop(columns='AtTableRate').rename(columns={
+                'Original': 'Original Amount', 'Charged': 'Charged ($)', 'Fees': 'Fees ($)'
+            })
+            st.caption("Effective rate includes conversion fees; markup compares it with the FX rate table for the same dates.")
+            st.dataframe(by_currency.round({'Original Amount': 2, 'Charged ($)': 2, 'Fees ($)': 2}), use_container_width=True)
+        
         # Expense Distribution
         st.subheader("📊 Expense Amount Distribution")
         fig_hist = px.histogram(filtered_df, x='Amount', nbins=30,
@@ -279,7 +433,10 @@ else:
         with st.expander("📋 View Raw Data"):
             display_df = filtered_df.copy()
             display_df['Date'] = display_df['Date'].dt.strftime('%Y-%m-%d')
-            display_df = display_df[['Date', 'Title', 'Amount', 'Category']].sort_values('Date', ascending=False)
+            display_columns = ['Date', 'Title', 'Amount', 'Category', 'Anomaly Score']
+            if len(accounts) > 1:
+                display_columns.insert(0, 'Account')
+            display_df = display_df[display_columns].sort_values('Date', ascending=False)
             
             st.dataframe(display_df, use_container_width=True)
             
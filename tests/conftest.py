@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Import utils the way the pages do, from the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,69 @@
+import asyncio
+import json
+
+import pytest
+
+from utils.api_server import LedgerApiServer
+
+
+@pytest.fixture
+def request_server(tmp_path):
+    """Send raw requests to a server over one connection; returns each response's status line and JSON body."""
+    server = LedgerApiServer(str(tmp_path / 'final_expenses.csv'), max_body=1024)
+
+    def send(*requests):
+        async def run():
+            await server._reload()
+            listener = await asyncio.start_server(server._handle_connection, '127.0.0.1', 0)
+            async with listener:
+                reader, writer = await asyncio.open_connection(*listener.sockets[0].getsockname())
+                writer.write(b''.join(requests))
+                await writer.drain()
+                responses = []
+                while status := await reader.readline():
+                    headers = {}
+                    while (line := await reader.readline()).strip():
+                        name, _, value = line.decode('latin-1').partition(':')
+                        headers[name.strip().lower()] = value.strip()
+                    body = await reader.readexactly(int(headers['content-length']))
+                    responses.append((status.decode('latin-1').split(' ', 2)[1], json.loads(body)))
+                writer.close()
+                return responses
+        # A connection the server wrongly keeps open fails the test instead of hanging it
+        return asyncio.run(asyncio.wait_for(run(), timeout=10))
+    send.server = server
+    return send
+
+
+def test_import_keeps_only_ledger_columns(request_server):
+    body = json.dumps([{'Date': '2025-01-03', 'Title': 'NETFLIX.COM', 'Amount': 17.98, 'Note': 'x' * 100}]).encode()
+    [(status, payload)] = request_server(
+        b'POST /expenses/import HTTP/1.1\r\nContent-Type: application/json\r\n'
+        b'Content-Length: %d\r\nConnection: close\r\n\r\n%s' % (len(body), body))
+
+    assert status == '200' and payload['ids'] == [1]
+    assert 'Note' not in request_server.server.store.load().columns
+
+
+def test_malformed_requests_are_rejected_and_close_the_connection(request_server):
+    assert request_server(b'GET /summary HTTP/1.1\r\nContent-Length: ten\r\n\r\nGET /summary HTTP/1.1\r\n\r\n') == [
+        ('400', {'error': 'Malformed request line or Content-Length'})]
+    assert request_server(b'GARBAGE\r\n\r\n')[0][0] == '400'
+
+
+def test_oversized_body_closes_the_connection(request_server):
+    # The unread body must not be parsed as the next request
+    responses = request_server(b'POST /expenses/import HTTP/1.1\r\nContent-Length: 2048\r\n\r\n'
+                               b'GET /summary HTTP/1.1\r\n\r\n' + b' ' * 2000)
+    assert [status for status, _ in responses] == ['413']
+
+
+def test_search_without_a_searchable_word_does_not_filter(request_server):
+    body = json.dumps([{'Date': '2025-01-03', 'Title': 'NETFLIX.COM', 'Amount': 17.98},
+                       {'Date': '2025-01-04', 'Title': 'GRAB RIDE', 'Amount': 9.5}]).encode()
+    responses = request_server(
+        b'POST /expenses/import HTTP/1.1\r\nContent-Length: %d\r\n\r\n%s' % (len(body), body),
+        b'GET /expenses?q=a HTTP/1.1\r\n\r\n',
+        b'GET /expenses?q=grab HTTP/1.1\r\nConnection: close\r\n\r\n')
+
+    assert [len(payload['rows']) for _, payload in responses[1:]] == [2, 1]
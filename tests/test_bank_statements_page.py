@@ -0,0 +1,54 @@
+import datetime
+import os
+
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+from utils.ledger_store import LedgerStore
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'pages')
+
+
+def save_rows(store, titles):
+    """Append rows the way another session does: under the lock, with IDs from the store."""
+    with store.lock():
+        next_id = store.next_id(store.load()) if store.exists() else 1
+        rows = LedgerStore.with_currency_columns(pd.DataFrame({
+            'ID': range(next_id, next_id + len(titles)),
+            'Date': [datetime.date(2025, 1, 1)] * len(titles),
+            'Title': titles,
+            'Amount': [10.0 + i for i in range(len(titles))],
+            'Category': 'Shopping',
+            'Manual': False,
+        }))
+        df = store.load() if store.exists() else LedgerStore.empty_frame()
+        store.write(LedgerStore.apply_change(df, {'op': 'append', 'rows': rows}), {'op': 'append', 'rows': rows})
+
+
+def test_page_picks_up_rows_other_sessions_save(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = LedgerStore('data/final_expenses.csv')
+    save_rows(store, ['NETFLIX.COM'])
+
+    page = AppTest.from_file(os.path.join(PAGES_DIR, '1-BankStatements.py'), default_timeout=120)
+    page.run()
+    assert page.session_state.final_expenses['Title'].tolist() == ['NETFLIX.COM']
+
+    save_rows(store, ['GRAB RIDE'])
+    page.run()
+
+    assert not page.exception
+    assert page.session_state.final_expenses['Title'].tolist() == ['NETFLIX.COM', 'GRAB RIDE']
+
+
+def test_page_loads_a_ledger_another_session_creates(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    page = AppTest.from_file(os.path.join(PAGES_DIR, '1-BankStatements.py'), default_timeout=120)
+    page.run()
+    assert page.session_state.final_expenses.empty
+
+    save_rows(LedgerStore('data/final_expenses.csv'), ['NETFLIX.COM', 'GRAB RIDE'])
+    page.run()
+
+    assert not page.exception
+    assert page.session_state.final_expenses['ID'].tolist() == [1, 2]
@@ -0,0 +1,54 @@
+import datetime
+import json
+import os
+
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+from utils.ledger_registry import LedgerRegistry
+from utils.ledger_store import LedgerStore
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'pages')
+
+
+def write_ledger(path, titles):
+    df = LedgerStore.with_currency_columns(pd.DataFrame({
+        'ID': range(1, len(titles) + 1),
+        'Date': [datetime.date(2025, 1, 1 + i) for i in range(len(titles))],
+        'Title': titles,
+        'Amount': [10.0 + i for i in range(len(titles))],
+        'Category': 'Shopping',
+        'Manual': False,
+    }))
+    LedgerStore(str(path)).write(df, {'op': 'reset'})
+
+
+def test_a_ledger_that_fails_to_load_only_drops_its_account(tmp_path):
+    write_ledger(tmp_path / 'card.csv', ['NETFLIX.COM'])
+    (tmp_path / 'bad.csv').write_text('Foo,Bar\n1,2\n')
+
+    errors = {}
+    ledgers = LedgerRegistry(str(tmp_path / 'ledgers.json')).load(
+        {'card': str(tmp_path / 'card.csv'), 'bad': str(tmp_path / 'bad.csv')}, errors=errors)
+
+    assert list(ledgers) == ['card']
+    assert ledgers['card']['df']['Title'].tolist() == ['NETFLIX.COM']
+    assert list(errors) == ['bad']
+
+
+def test_analysis_page_skips_an_account_whose_ledger_fails_to_load(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('data')
+    write_ledger('data/final_expenses.csv', ['NETFLIX.COM', 'GRAB RIDE'])
+    write_ledger('data/card.csv', ['KOUFU'])
+    with open('data/bad.csv', 'w', encoding='utf-8') as f:
+        f.write('Foo,Bar\n1,2\n')
+    with open('data/ledgers.json', 'w', encoding='utf-8') as f:
+        json.dump({'main': 'data/final_expenses.csv', 'card': 'data/card.csv', 'bad': 'data/bad.csv'}, f)
+
+    page = AppTest.from_file(os.path.join(PAGES_DIR, '2-Analysis.py'), default_timeout=120)
+    page.run()
+
+    assert not page.exception
+    assert any("'bad'" in warning.value for warning in page.sidebar.warning)
+    assert not page.error
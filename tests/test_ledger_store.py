@@ -0,0 +1,188 @@
+import datetime
+import threading
+
+import pandas as pd
+import pytest
+
+from utils.ledger_store import LedgerStore
+
+
+def make_rows(ids, titles, day=1):
+    return LedgerStore.with_currency_columns(pd.DataFrame({
+        'ID': pd.Series(ids, dtype='int64'),
+        'Date': [datetime.date(2025, 1, day)] * len(ids),
+        'Title': titles,
+        'Amount': [10.0 + i for i in range(len(ids))],
+        'Category': 'Shopping',
+        'Manual': False,
+    }))
+
+
+class Session:
+    """The writer protocol DataManager follows: sync under the lock, build the change, write it."""
+
+    def __init__(self, store):
+        self.store = store
+        self.version, self.offset = store.head()
+        self.df = store.load() if store.exists() else LedgerStore.empty_frame()
+
+    def sync(self):
+        changes, self.version, self.offset = self.store.changes_since(self.version, self.offset)
+        df, _ = self.store.replay(self.df, changes)
+        if df is None:
+            self.version, self.offset = self.store.head()
+            df = self.store.load()
+        self.df = df
+
+    def commit(self, build_change):
+        with self.store.lock():
+            self.sync()
+            change = build_change(self.df)
+            self.df = LedgerStore.apply_change(self.df, change)
+            self.version, self.offset = self.store.write(self.df, change)
+
+    def append(self, titles):
+        def build_change(df):
+            next_id = self.store.next_id(df)
+            return {'op': 'append', 'rows': make_rows(range(next_id, next_id + len(titles)), titles)}
+        self.commit(build_change)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LedgerStore(str(tmp_path / 'final_expenses.csv'))
+
+
+def test_replaying_the_change_log_matches_the_saved_ledger(store):
+    writer = Session(store)
+    writer.append(['NETFLIX.COM', 'GRAB RIDE', 'KOUFU'])
+    writer.commit(lambda df: {'op': 'update', 'rows': pd.DataFrame({'ID': [2], 'Category': ['Transportation']})})
+    writer.commit(lambda df: {'op': 'delete', 'ids': [1]})
+    writer.append(['UNIQLO'])
+
+    reader = Session.__new__(Session)
+    reader.store, reader.version, reader.offset, reader.df = store, 0, 0, LedgerStore.empty_frame()
+    reader.sync()
+
+    assert reader.version == store.head()[0] == 4
+    assert LedgerStore.to_records(reader.df) == LedgerStore.to_records(store.load())
+    assert reader.df['ID'].tolist() == [2, 3, 4]
+    assert reader.df.loc[reader.df['ID'] == 2, 'Category'].item() == 'Transportation'
+
+
+def test_sessions_that_sync_late_keep_each_others_rows(store):
+    first, second = Session(store), Session(store)
+    first.append(['FIRST'])
+    # The second session hasn't seen the first one's row when it saves
+    second.append(['SECOND'])
+
+    assert second.df['ID'].tolist() == [1, 2]
+    assert store.load()['Title'].tolist() == ['FIRST', 'SECOND']
+    first.sync()
+    assert first.df['Title'].tolist() == ['FIRST', 'SECOND']
+
+
+def test_concurrent_writers_get_unique_versions_and_ids(store):
+    sessions = [Session(store) for _ in range(4)]
+    threads = [threading.Thread(target=lambda s=s, n=n: [s.append([f'SESSION {n} ROW {i}']) for i in range(5)])
+               for n, s in enumerate(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    changes, version, _ = store.changes_since(0, 0)
+    assert [change['version'] for change in changes] == list(range(1, 21))
+    ids = [row['ID'] for change in changes for row in change['rows']]
+    assert sorted(ids) == list(range(1, 21))
+    saved = store.load()
+    assert sorted(saved['ID']) == list(range(1, 21))
+    assert saved['Title'].nunique() == 20
+
+
+def test_ids_of_deleted_rows_are_not_reused(store):
+    session = Session(store)
+    session.append(['CHARGE', 'CCY CONVERSION FEE', 'LAST'])
+    session.commit(lambda df: {'op': 'delete', 'ids': [3]})
+    session.commit(lambda df: {'op': 'delete', 'ids': [2]})
+    session.append(['NEW'])
+
+    assert session.df['ID'].tolist() == [1, 4]
+    # A new session, starting from the files alone, continues above them too
+    Session(store).append(['NEWER'])
+    assert store.load()['ID'].tolist() == [1, 4, 5]
+
+
+def test_appends_add_lines_instead_of_rewriting_the_csv(store):
+    session = Session(store)
+    session.append(['FIRST', 'SECOND'])
+    with open(store.expense_file_path, 'rb') as f:
+        before = f.read()
+    session.append(['THIRD'])
+
+    with open(store.expense_file_path, 'rb') as f:
+        after = f.read()
+    assert after.startswith(before)
+    assert after[len(before):].count(b'\n') == 1
+    assert store.load()['Title'].tolist() == ['FIRST', 'SECOND', 'THIRD']
+    assert store.load()['Parent ID'].isna().all()
+
+
+def test_appending_to_an_older_layout_rewrites_the_csv(store):
+    pd.DataFrame({'Date': ['2024-12-31'], 'Title': ['OLD'], 'Amount': [5.0], 'Category': ['Other']}).to_csv(
+        store.expense_file_path, index=False)
+    Session(store).append(['NEW'])
+
+    with open(store.expense_file_path, encoding='utf-8') as f:
+        assert f.readline().startswith('ID,Date,Title,Amount,Category,Manual')
+    assert store.load()[['ID', 'Title']].values.tolist() == [[1, 'OLD'], [2, 'NEW']]
+
+
+def test_rows_added_by_hand_without_an_id_get_lasting_new_ids(store):
+    session = Session(store)
+    session.append(['FIRST', 'SECOND', 'DELETED'])
+    session.commit(lambda df: {'op': 'delete', 'ids': [3]})
+    with open(store.expense_file_path, 'a', encoding='utf-8') as f:
+        f.write(',2025-01-05,ADDED BY HAND,7.5,Other,False,,,,\n')
+
+    assert store.load()[['ID', 'Title']].values.tolist() == [[1, 'FIRST'], [2, 'SECOND'], [4, 'ADDED BY HAND']]
+    Session(store).append(['NEW'])
+    assert store.load()['ID'].tolist() == [1, 2, 4, 5]
+
+
+def test_rows_of_ledgers_without_the_manual_flag_keep_hand_picked_categories(store):
+    pd.DataFrame({
+        'Date': ['2024-12-01', '2024-12-02', '2024-12-03'],
+        'Title': ['NETFLIX.COM', 'NETFLIX.COM', 'UNKNOWN SHOP'],
+        'Amount': [17.98, 17.98, 5.0],
+        'Category': ['Food & Dining', 'Entertainment', 'Other'],
+    }).to_csv(store.expense_file_path, index=False)
+
+    # Only the category the rules can't explain was picked by hand, so recategorizing leaves it alone
+    assert store.load()['Manual'].tolist() == [True, False, False]
+
+
+def test_a_partly_written_log_entry_is_left_for_later(store):
+    session = Session(store)
+    session.append(['FIRST'])
+    complete = store.head()
+    with open(store.changelog_path, 'ab') as f:
+        f.write(b'{"version": 2, "max_id": 2, "op": "app')
+
+    # Readers take their cursor without the lock, possibly while a writer is mid-entry
+    assert store.head() == complete
+    assert store.changes_since(*complete) == ([], *complete)
+    with open(store.changelog_path, 'ab') as f:
+        f.write(b'end", "rows": []}\n')
+    changes, version, _ = store.changes_since(*complete)
+    assert [change['version'] for change in changes] == [2] and version == 2
+
+
+def test_unsaved_rows_skip_saved_and_repeated_rows(store):
+    session = Session(store)
+    session.append(['NETFLIX.COM'])
+    statement = pd.concat([session.df, *[make_rows([0], ['GRAB RIDE'], day=2)] * 2], ignore_index=True)
+
+    with store.lock():
+        new_rows = store.unsaved_rows(statement, session.df)
+    assert new_rows[['ID', 'Title']].values.tolist() == [[2, 'GRAB RIDE']]
@@ -0,0 +1,21 @@
+import pandas as pd
+
+from utils.merchant_index import MerchantIndex
+
+
+def test_changes_are_applied_one_version_at_a_time():
+    ledger = pd.DataFrame({'ID': [1, 2], 'Title': ['NETFLIX.COM', 'GRAB RIDE']})
+    index = MerchantIndex.build(ledger, version=1)
+
+    appended = pd.DataFrame({'ID': [3], 'Title': ['GRAB FOOD']})
+    assert index.apply_change({'op': 'append', 'rows': appended}, pd.concat([ledger, appended]), 2)
+    assert index.search('grab').tolist() == [2, 3]
+
+    renamed = pd.DataFrame({'ID': [2, 3], 'Title': ['GOJEK RIDE', 'GRAB FOOD']})
+    assert index.apply_change({'op': 'update', 'rows': renamed[['ID', 'Title']].head(1)}, renamed, 3)
+    assert index.search('grab').tolist() == [3]
+    assert index.search('gojek').tolist() == [2]
+
+    # A change that skips a version leaves the stale index alone
+    assert not index.apply_change({'op': 'delete', 'ids': [3]}, renamed.head(1), 5)
+    assert index.version == 3 and index.search('grab').tolist() == [3]
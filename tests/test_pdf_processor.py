@@ -0,0 +1,49 @@
+from datetime import datetime
+
+import pymupdf4llm
+import pytest
+
+from utils import pdf_processor
+from utils.pdf_processor import PDFProcessor
+
+
+@pytest.fixture
+def extract(monkeypatch):
+    def extract(lines):
+        monkeypatch.setattr(pymupdf4llm, 'to_markdown', lambda path: '\n'.join(['KOK CHUN SHEN', *lines]))
+        return PDFProcessor().extract('statement.pdf', 'statement.pdf')
+    return extract
+
+
+def test_foreign_amounts_keep_their_sign():
+    processor = PDFProcessor()
+    assert processor.parse_foreign_amount('AMAZON USD 10.00') == ('USD', 10.0)
+    assert processor.parse_foreign_amount('USD (10.00)') == ('USD', -10.0)
+    assert processor.parse_foreign_amount('USD -1,234.50') == ('USD', -1234.5)
+
+
+def test_original_amount_is_only_taken_from_the_line_below_a_charge(extract):
+    df = extract([
+        '03 JAN AMAZON SEATTLE (13.40)',
+        'USD (10.00)',
+        '04 JAN KOUFU 5.20',
+        'SUBTOTAL',
+        'JPY 1,000.00',
+    ])
+
+    assert df.loc[0, 'original_currency'] == 'USD'
+    assert df.loc[0, 'original_amount'] == -10.0
+    assert df.loc[1, ['original_currency', 'original_amount']].isna().all()
+
+
+def test_statement_year_is_taken_when_extracting(monkeypatch):
+    def clock(now):
+        monkeypatch.setattr(pdf_processor, 'datetime', type('Clock', (datetime,), {'now': staticmethod(lambda: now)}))
+
+    # Built in December, as the shared processor may be, and used for a January statement
+    clock(datetime(2025, 12, 31))
+    processor = PDFProcessor()
+    clock(datetime(2026, 1, 5))
+    monkeypatch.setattr(pymupdf4llm, 'to_markdown', lambda path: 'KOK CHUN SHEN\n03 JAN KOUFU 5.20')
+
+    assert processor.extract('statement.pdf', 'statement.pdf')['date'].tolist() == [datetime(2026, 1, 3)]
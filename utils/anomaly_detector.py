@@ -0,0 +1,141 @@
+import pandas as pd
+import numpy as np
+from utils.merchants import factorize_merchants
+
+SCORE_COLUMNS = ['ID', 'Date', 'Title', 'Amount', 'Baseline', 'Anomaly Score', 'Anomaly']
+
+
+class AnomalyDetector:
+    """Scores transactions against rolling per-merchant and per-category baselines.
+
+    Each transaction is compared with the median and MAD (median absolute deviation)
+    of the previous `window` transactions at the same merchant, or in the same
+    category when the merchant has too little history. Amounts are compared on a
+    log scale, since spending is roughly log-normal. Scores are robust z-scores;
+    transactions at least `threshold` above their baseline and at least
+    `min_excess` dollars over it are flagged.
+    """
+
+    def __init__(self, window=20, min_history=5, threshold=3.5, min_excess=10.0, chunk_size=100_000):
+        self.window = window
+        self.min_history = min_history
+        self.threshold = threshold
+        self.min_excess = min_excess
+        self.chunk_size = chunk_size
+
+    def score(self, expenses_df, previous=None):
+        """
+        Score the ledger, reusing `previous` results for rows that are unchanged since.
+
+        Only new rows, and rows whose date, title or amount changed, are scored again;
+        other rows keep the score they got against the history known at the time.
+        Returns a DataFrame with the columns in SCORE_COLUMNS, one row per ledger ID.
+        """
+        if expenses_df.empty:
+            return pd.DataFrame(columns=SCORE_COLUMNS)
+
+        df = pd.DataFrame({
+            'ID': expenses_df['ID'].to_numpy(),
+            'Date': pd.to_datetime(expenses_df['Date']).to_numpy(),
+            'Title': expenses_df['Title'].to_numpy(),
+            'Amount': expenses_df['Amount'].astype(float).to_numpy(),
+        })
+
+        # Decide which rows need a (new) score
+        if previous is None or previous.empty:
+            kept = previous.iloc[:0] if previous is not None else pd.DataFrame(columns=SCORE_COLUMNS)
+            to_score = np.ones(len(df), dtype=bool)
+        else:
+            matched = df[['ID', 'Date', 'Title', 'Amount']].merge(previous, on='ID', how='left', suffixes=('', '_scored'))
+            unchanged = (
+                (matched['Date'] == matched['Date_scored'])
+                & (matched['Title'] == matched['Title_scored'])
+                & (matched['Amount'] == matched['Amount_scored'])
+            ).fillna(False).to_numpy()
+            kept = previous[previous['ID'].isin(df['ID'].to_numpy()[unchanged])]
+            to_score = ~unchanged
+        if not to_score.any():
+            return kept.reset_index(drop=True)
+
+        merchant_codes, _ = factorize_merchants(expenses_df['Title'])
+        category_codes, _ = pd.factorize(expenses_df['Category'].fillna('Other'))
+        dates = df['Date'].to_numpy().astype('int64')
+        ids = df['ID'].to_numpy()
+        amounts = df['Amount'].to_numpy()
+        log_amounts = np.sign(amounts) * np.log1p(np.abs(amounts))
+
+        merchant_median, merchant_mad, merchant_history = self._rolling_baseline(merchant_codes, dates, ids, log_amounts, to_score)
+        category_median, category_mad, category_history = self._rolling_baseline(category_codes, dates, ids, log_amounts, to_score)
+
+        # Prefer the merchant's own history, fall back to the category's
+        use_merchant = merchant_history >= self.min_history
+        median = np.where(use_merchant, merchant_median, category_median)
+        mad = np.where(use_merchant, merchant_mad, category_mad)
+        enough_history = use_merchant | (category_history >= self.min_history)
+
+        # MAD is 0 for fixed-price merchants; floor the spread (~5%) so small price changes don't stand out
+        scale = np.maximum(1.4826 * mad, 0.05)
+        scores = np.where(enough_history, (log_amounts[to_score] - median) / scale, np.nan)
+        baseline = np.where(enough_history, np.sign(median) * np.expm1(np.abs(median)), np.nan)
+        anomaly = (scores >= self.threshold) & (amounts[to_score] - baseline >= self.min_excess)
+
+        scored = df[to_score].assign(
+            Baseline=baseline.round(2),
+            **{'Anomaly Score': scores.round(2), 'Anomaly': anomaly},
+        )
+        if kept.empty:
+            return scored[SCORE_COLUMNS].reset_index(drop=True)
+        return pd.concat([kept, scored[SCORE_COLUMNS]], ignore_index=True).sort_values('ID', ignore_index=True)
+
+    def _rolling_baseline(self, keys, dates, ids, amounts, targets):
+        """
+        Median, MAD and history length of the previous `window` amounts in each target row's group.
+
+        Rows are ordered by (group, date, ID); the previous rows of every target are gathered
+        into a (targets x window) matrix so the medians are computed with vectorized nanmedian.
+        """
+        # Only groups that contain a target row matter; this keeps incremental runs small
+        relevant = np.isin(keys, np.unique(keys[targets]))
+        if not relevant.all():
+            keys, dates, ids, amounts, targets = keys[relevant], dates[relevant], ids[relevant], amounts[relevant], targets[relevant]
+
+        order = np.lexsort((ids, dates, keys))
+        sorted_keys = keys[order]
+        sorted_amounts = amounts[order]
+        n = len(order)
+
+        # Position where each row's group starts in sorted order
+        starts = np.r_[0, np.flatnonzero(sorted_keys[1:] != sorted_keys[:-1]) + 1]
+        group_start = np.repeat(starts, np.diff(np.r_[starts, n]))
+
+        # Sorted positions of the target rows, remembered in their original order
+        position_of = np.empty(n, dtype=np.int64)
+        position_of[order] = np.arange(n)
+        positions = position_of[targets]
+
+        median = np.empty(len(positions))
+        mad = np.empty(len(positions))
+        history = np.empty(len(positions), dtype=np.int64)
+        offsets = np.arange(1, self.window + 1)
+        for start in range(0, len(positions), self.chunk_size):
+            chunk = positions[start:start + self.chunk_size]
+            previous = chunk[:, None] - offsets[None, :]
+            valid = previous >= group_start[chunk][:, None]
+            values = np.where(valid, sorted_amounts[np.maximum(previous, 0)], np.nan)
+            counts = valid.sum(axis=1)
+
+            chunk_median = self._row_medians(values, counts)
+            median[start:start + len(chunk)] = chunk_median
+            mad[start:start + len(chunk)] = self._row_medians(np.abs(values - chunk_median[:, None]), counts)
+            history[start:start + len(chunk)] = counts
+        return median, mad, history
+
+    @staticmethod
+    def _row_medians(values, counts):
+        """Median of each row's first `counts` non-NaN values; much faster than np.nanmedian on many short rows."""
+        # Sorting moves NaNs to the end of each row
+        ordered = np.sort(values, axis=1)
+        rows = np.arange(len(ordered))
+        low = ordered[rows, np.maximum(counts - 1, 0) // 2]
+        high = ordered[rows, counts // 2]
+        return np.where(counts > 0, (low + high) / 2, np.nan)
@@ -0,0 +1,358 @@
+"""Local JSON/HTTP API over the expense ledger.
+
+    python -m utils.api_server [--ledger data/final_expenses.csv] [--host 127.0.0.1] [--port 8765]
+
+Endpoints:
+    GET  /expenses             Query rows: start, end (YYYY-MM-DD), category (repeatable), q (merchant
+                               search), fuzzy, min_amount, max_amount, limit, offset
+    GET  /summary              Summary statistics, as DataManager.get_expense_summary
+    GET  /summary/categories   Total, count and mean per category, as DataManager.get_category_summary
+    POST /expenses/import      Bulk import a JSON list of rows (or {"rows": [...]}) or a CSV body
+"""
+import argparse
+import asyncio
+import datetime
+import io
+import json
+import os
+from urllib.parse import urlsplit, parse_qs
+import numpy as np
+import pandas as pd
+from utils.ledger_store import LedgerStore, LEDGER_COLUMNS
+from utils.learned_categorizer import LearnedCategorizer
+from utils.merchant_index import MerchantIndex
+from utils.pdf_processor import PDFProcessor
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class ApiError(Exception):
+    """An error reported to the client with an HTTP status, closing the connection when the request can't be framed."""
+
+    def __init__(self, status, message, close=False):
+        super().__init__(message)
+        self.status = status
+        self.close = close
+
+
+class LedgerApiServer:
+    """Serves a ledger file to local tools over HTTP, next to the Streamlit app.
+
+    Requests read an in-memory snapshot of the ledger that is replaced, never modified,
+    so any number of readers proceed while one import is written on a worker thread.
+    Imports hold the ledger's write lock (see LedgerStore.lock), shared with Streamlit
+    sessions and other processes. Responses and aggregates are cached per ledger version,
+    and changes saved by Streamlit sessions are picked up from the ledger's change log
+    like any other session.
+    """
+
+    def __init__(self, expense_file_path, cache_size=256, max_body=64 * 1024 * 1024):
+        self.store = LedgerStore(expense_file_path)
+        self.cache_size = cache_size
+        self.max_body = max_body
+        self.df = LedgerStore.empty_frame()
+        self.version = 0
+        self.offset = 0
+        self.index = None
+        self.aggregates = {}  # name -> value for the current version
+        self.responses = {}  # request target -> encoded response body for the current version
+        self.write_lock = asyncio.Lock()
+        self.routes = {
+            '/expenses': ('GET', self.query),
+            '/summary': ('GET', self.summary),
+            '/summary/categories': ('GET', self.category_summary),
+            '/expenses/import': ('POST', self.bulk_import),
+        }
+
+    async def serve(self, host='127.0.0.1', port=8765):
+        """Load the ledger and serve requests until cancelled."""
+        await self._reload()
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+    # Endpoints
+
+    def query(self, params):
+        """Rows matching the filters, in ledger order."""
+        df = self.df
+        mask = np.ones(len(df), dtype=bool)
+        dates = self._aggregate('dates', lambda: pd.to_datetime(df['Date']).to_numpy())
+        if 'start' in params:
+            mask &= dates >= np.datetime64(self._param_date(params, 'start'))
+        if 'end' in params:
+            mask &= dates <= np.datetime64(self._param_date(params, 'end'))
+        if 'category' in params:
+            mask &= df['Category'].isin(params['category']).to_numpy()
+        if 'min_amount' in params:
+            mask &= df['Amount'].to_numpy() >= self._param_float(params, 'min_amount')
+        if 'max_amount' in params:
+            mask &= df['Amount'].to_numpy() <= self._param_float(params, 'max_amount')
+        if params.get('q', [''])[0].strip():
+            fuzzy = params.get('fuzzy', ['false'])[0].lower() in ('1', 'true', 'yes')
+            ids = self._search_index().search(params['q'][0], fuzzy=fuzzy)
+            if ids is not None:  # No searchable word in q
+                mask &= df['ID'].isin(ids).to_numpy()
+
+        matches = np.flatnonzero(mask)
+        offset = int(self._param_float(params, 'offset', 0))
+        limit = min(int(self._param_float(params, 'limit', 100)), 10000)
+        return {
+            'version': self.version,
+            'total': len(matches),
+            'rows': LedgerStore.to_records(df.iloc[matches[offset:offset + limit]])
+        }
+
+    def summary(self, params):
+        """Summary statistics of the whole ledger."""
+        return {'version': self.version, 'summary': self._aggregate('summary', lambda: LedgerStore.expense_summary(self.df))}
+
+    def category_summary(self, params):
+        """Per-category totals of the whole ledger."""
+        categories = self._aggregate('categories', lambda: LedgerStore.category_summary(self.df))
+        return {'version': self.version, 'categories': categories.to_dict(orient='records')}
+
+    async def bulk_import(self, params, body, content_type):
+        """Append new rows; rows already in the ledger are skipped, as when saving a statement."""
+        rows = self._parse_rows(body, content_type)
+        async with self.write_lock:
+            # Readers keep using the current snapshot while the import is written on a worker thread
+            df, new_rows, version, offset, synced = await asyncio.to_thread(
+                self._write_import, rows, self.df, self.version, self.offset)
+            if synced is None:
+                self.index = None
+            else:
+                self._index_changes(synced, df)
+            self._set_snapshot(df, version, offset)
+        return {'version': version, 'imported': len(new_rows), 'skipped': len(rows) - len(new_rows),
+                'ids': new_rows['ID'].tolist()}
+
+    def _write_import(self, rows, df, version, offset):
+        """Append imported rows to the ledger under its write lock, shared with the Streamlit sessions.
+
+        Returns (ledger, new rows, version, offset, changes applied to `df`, the import included);
+        the changes are None if the ledger had to be reloaded.
+        """
+        with self.store.lock():
+            changes, version, offset = self.store.changes_since(version, offset)
+            df, synced = self.store.replay(df, changes)
+            if df is None:
+                version, offset = self.store.head()
+                df = self.store.load() if self.store.exists() else LedgerStore.empty_frame()
+
+            new_rows = self._new_rows(rows, df)
+            if not new_rows.empty:
+                change = {'op': 'append', 'rows': new_rows}
+                df = LedgerStore.apply_change(df, change)
+                version, offset = self.store.write(df, change)
+                if synced is not None:
+                    synced.append({**change, 'version': version})
+        return df, new_rows, version, offset, synced
+
+    # Ledger state
+
+    async def _reload(self):
+        """Load the full ledger, taking the change log cursor first so concurrent writes are replayed."""
+        version, offset = self.store.head()
+        df = await asyncio.to_thread(self.store.load) if self.store.exists() else LedgerStore.empty_frame()
+        self.index = None
+        self._set_snapshot(df, version, offset)
+
+    async def _sync(self):
+        """Apply changes other processes saved since the snapshot; a single stat when there are none."""
+        changes, version, offset = self.store.changes_since(self.version, self.offset)
+        if not changes:
+            return
+        df, synced = self.store.replay(self.df, changes)
+        if df is None:
+            await self._reload()
+            return
+        self._index_changes(synced, df)
+        self._set_snapshot(df, version, offset)
+
+    def _set_snapshot(self, df, version, offset):
+        """Replace the served ledger; cached responses and aggregates belong to the old one."""
+        if version != self.version or df is not self.df:
+            self.aggregates = {}
+            self.responses = {}
+        self.df, self.version, self.offset = df, version, offset
+
+    def _aggregate(self, name, compute):
+        """Return `compute()`, cached until the ledger changes."""
+        if name not in self.aggregates:
+            self.aggregates[name] = compute()
+        return self.aggregates[name]
+
+    def _search_index(self):
+        """Get the merchant search index, built on first use and kept up to date with changes."""
+        if self.index is None or self.index.version != self.version:
+            self.index = MerchantIndex.build(self.df, self.version)
+        return self.index
+
+    def _index_changes(self, changes, updated_df):
+        """Apply saved changes to the search index, if it was built (see MerchantIndex.apply_change)."""
+        if self.index is not None:
+            for change in changes:
+                self.index.apply_change(change, updated_df, change['version'])
+
+    # Imports
+
+    def _parse_rows(self, body, content_type):
+        """Parse an import body into a frame of rows with at least Date, Title and Amount."""
+        try:
+            if content_type.startswith('text/csv'):
+                rows = pd.read_csv(io.BytesIO(body))
+            else:
+                records = json.loads(body or b'[]')
+                rows = pd.DataFrame(records['rows'] if isinstance(records, dict) else records)
+        except (ValueError, KeyError, TypeError) as e:
+            raise ApiError(400, f"Invalid import body: {str(e)}")
+
+        missing = [c for c in ['Date', 'Title', 'Amount'] if c not in rows.columns]
+        if missing:
+            raise ApiError(400, f"Import rows need {', '.join(missing)}")
+        try:
+            rows['Date'] = pd.to_datetime(rows['Date']).dt.date
+            rows['Amount'] = rows['Amount'].astype('float64')
+        except (ValueError, TypeError) as e:
+            raise ApiError(400, f"Invalid import rows: {str(e)}")
+        rows['Title'] = rows['Title'].astype(str)
+        return rows
+
+    def _new_rows(self, rows, df):
+        """Categorize rows, drop those already saved in `df`, and give the rest ledger IDs."""
+        # Only ledger columns are saved; IDs are always assigned here
+        rows = rows[[c for c in LEDGER_COLUMNS if c in rows.columns and c != 'ID']].copy()
+        given = rows['Category'].notna() if 'Category' in rows.columns else pd.Series(False, index=rows.index)
+        if not given.all():
+            categories = PDFProcessor().categorize_series(rows.loc[~given, 'Title'], self._categorizer())
+            rows.loc[~given, 'Category'] = categories.to_numpy()
+        # Categories the caller picked survive recategorization, like hand-picked ones
+        rows['Manual'] = rows['Manual'].fillna(given).astype(bool) if 'Manual' in rows.columns else given.to_numpy()
+        return LedgerStore.with_currency_columns(self.store.unsaved_rows(rows, df).reset_index(drop=True))
+
+    def _categorizer(self):
+        """The categorizer the app last saved for this ledger, or None."""
+        try:
+            return LearnedCategorizer.load(self.store.categorizer_path)
+        except Exception:
+            return None
+
+    # HTTP
+
+    async def _handle_connection(self, reader, writer):
+        """Serve requests on one keep-alive connection."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                status, body, close = await self._respond(request_line, headers, reader)
+                keep_alive = not close and headers.get('connection', '').lower() != 'close'
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + body
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, request_line, headers, reader):
+        """Route one request and return (status, encoded JSON body, whether to close the connection)."""
+        try:
+            try:
+                method, target, _ = request_line.decode('latin-1').split()
+                length = int(headers.get('content-length', 0))
+                if length < 0:
+                    raise ValueError(length)
+            except ValueError:
+                raise ApiError(400, "Malformed request line or Content-Length", close=True)
+            if length > self.max_body:
+                # The body is left unread, so the connection can't carry another request
+                raise ApiError(413, f"Body larger than {self.max_body} bytes", close=True)
+            body = await reader.readexactly(length) if length else b''
+
+            url = urlsplit(target)
+            if url.path not in self.routes:
+                raise ApiError(404, f"No endpoint {url.path}")
+            route_method, handler = self.routes[url.path]
+            if method != route_method:
+                raise ApiError(405, f"{url.path} only supports {route_method}")
+            params = parse_qs(url.query)
+
+            if method == 'POST':
+                return 200, self._encode(await handler(params, body, headers.get('content-type', ''))), False
+            if not self.write_lock.locked():
+                await self._sync()  # An import in progress updates the snapshot itself
+            if target not in self.responses:
+                if len(self.responses) >= self.cache_size:
+                    del self.responses[next(iter(self.responses))]
+                self.responses[target] = self._encode(handler(params))
+            return 200, self.responses[target], False
+        except ApiError as e:
+            return e.status, self._encode({'error': str(e)}), e.close
+        except Exception as e:
+            return 500, self._encode({'error': f"Error handling request: {str(e)}"}), False
+
+    @staticmethod
+    def _encode(payload):
+        """Encode a response payload, including numpy scalars and dates, as JSON."""
+        def default(value):
+            if isinstance(value, (datetime.date, pd.Timestamp)):
+                return value.isoformat()
+            if isinstance(value, np.generic):
+                return value.item()
+            if value is pd.NA or value is pd.NaT:
+                return None
+            raise TypeError(f"Cannot encode {type(value).__name__}")
+        return json.dumps(payload, default=default).encode('utf-8')
+
+    @staticmethod
+    def _param_date(params, name):
+        try:
+            return datetime.date.fromisoformat(params[name][0])
+        except ValueError:
+            raise ApiError(400, f"{name} must be a YYYY-MM-DD date")
+
+    @staticmethod
+    def _param_float(params, name, default=None):
+        if name not in params:
+            return default
+        try:
+            return float(params[name][0])
+        except ValueError:
+            raise ApiError(400, f"{name} must be a number")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ledger', default=os.environ.get('EXPENSE_FILE_PATH', 'data/final_expenses.csv'),
+                        help='ledger CSV to serve')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on; keep it local')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"Serving {args.ledger} on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(LedgerApiServer(args.ledger).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,20 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import os
-import datetime
+from utils.fx_rates import FxRates
+from utils.ledger_store import LedgerStore, KEY_COLUMNS
+from utils.learned_categorizer import LearnedCategorizer
+from utils.merchant_index import MerchantIndex
+from utils.ledger_registry import LedgerRegistry
 
 class DataManager:
     """Handles all data management operations for the expense tracker with password-protected Excel files."""
     
     def __init__(self,expense_file_path):
         self.expense_file_path = expense_file_path
+        self.registry = LedgerRegistry()
+        self.store = LedgerStore(expense_file_path, self.registry.account_for(expense_file_path))
         self.password = None
         self._initialize_session_state()
         self._get_password()
@@ -18,9 +25,11 @@ class DataManager:
         if 'expenses_df' not in st.session_state:
             st.session_state.expenses_df = pd.DataFrame(columns=['Date', 'Title', 'Amount', 'Category'])
         if 'final_expenses' not in st.session_state:
-            st.session_state.final_expenses = pd.DataFrame(columns=['Date', 'Title', 'Amount', 'Category'])
+            st.session_state.final_expenses = LedgerStore.empty_frame()
         if 'file_password' not in st.session_state:
             st.session_state.file_password = None
+        if 'ledger_cursor' not in st.session_state:
+            st.session_state.ledger_cursor = {'path': None, 'version': 0, 'offset': 0}
     
     def _get_password(self):
         """Get password from user input or session state."""
@@ -83,8 +92,8 @@ class DataManager:
     def _is_file_encrypted(self):
         """Check if the Excel file is password protected."""
         try:
-            # Try to open without password first
-            pd.read_csv(self.expense_file_path)
+            # Try to open without password first; the header is enough to tell
+            pd.read_csv(self.expense_file_path, nrows=1)
             return False  # File opened successfully, not encrypted
         except Exception as e:
             if "password" in str(e).lower() or "encrypted" in str(e).lower():
@@ -93,32 +102,60 @@ class DataManager:
     
     
     def _load_existing_expenses(self):
-        """Load existing final expenses from Excel file if it exists."""
+        """Load existing final expenses, or apply changes saved by other sessions since the last load."""
         if not self.password:
             return  # Can't load without password
             
-        if os.path.exists(self.expense_file_path) and st.session_state.final_expenses.empty:
-            try:
-                # Create data directory if it doesn't exist
-                os.makedirs(os.path.dirname(self.expense_file_path), exist_ok=True)
-                
-                # Try to load encrypted file first
-                try:
-                    st.session_state.final_expenses = pd.read_csv(self.expense_file_path)
-                except Exception:
-                    # Try to load as unencrypted Excel file
-                    st.session_state.final_expenses = pd.read_csv(self.expense_file_path)
-                
-                # Process loaded data
-                if not st.session_state.final_expenses.empty:
-                    st.session_state.final_expenses['Date'] = pd.to_datetime(st.session_state.final_expenses['Date']).dt.date
-                    
-                    # Add Category column if it doesn't exist (for backward compatibility)
-                    if 'Category' not in st.session_state.final_expenses.columns:
-                        st.session_state.final_expenses['Category'] = 'Other'
-                        
-            except Exception as e:
-                st.sidebar.error(f"Error loading expenses: {str(e)}")
+        if not self.store.exists():
+            return
+        
+        cursor = st.session_state.ledger_cursor
+        if st.session_state.final_expenses.empty or cursor['path'] != self.expense_file_path:
+            self._reload_final_expenses()
+        else:
+            self.sync_changes()
+    
+    def _reload_final_expenses(self):
+        """Load the full ledger from disk and reset the change cursor."""
+        try:
+            # Take the cursor before reading so concurrent writes are replayed, not missed
+            version, offset = self.store.head()
+            st.session_state.final_expenses = self.store.load()
+            st.session_state.ledger_cursor = {'path': self.expense_file_path, 'version': version, 'offset': offset}
+        except Exception as e:
+            st.sidebar.error(f"Error loading expenses: {str(e)}")
+    
+    def get_ledger_version(self):
+        """Get the ledger version this session has applied."""
+        return st.session_state.ledger_cursor['version']
+    
+    def sync_changes(self):
+        """Apply ledger changes saved by other sessions. Returns the number of changes applied."""
+        cursor = st.session_state.ledger_cursor
+        if cursor['path'] != self.expense_file_path:
+            # Nothing loaded from this ledger yet, e.g. it was created by another session: load it whole
+            if self.password and self.store.exists():
+                self._reload_final_expenses()
+            return 0
+        try:
+            changes, version, offset = self.store.changes_since(cursor['version'], cursor['offset'])
+        except Exception as e:
+            st.sidebar.error(f"Error reading ledger changes: {str(e)}")
+            return 0
+        if not changes:
+            return 0
+        
+        df, parsed = self.store.replay(st.session_state.final_expenses, changes)
+        if df is None:
+            # Anything we can't apply as a delta falls back to a full reload
+            self._reload_final_expenses()
+            return len(changes)
+        st.session_state.final_expenses = df
+        for change in parsed:
+            self._index_change(change, df, change['version'])
+        
+        st.session_state.ledger_cursor = {'path': self.expense_file_path, 'version': version, 'offset': offset}
+        return len(changes)
     
     def get_current_expenses(self):
         """Get current expenses being processed."""
@@ -129,11 +166,59 @@ class DataManager:
         # Ensure Category column exists
         if 'Category' not in expenses_df.columns:
             expenses_df['Category'] = 'Other'
+        # Extracted rows are categorized by the rules
+        if 'Manual' not in expenses_df.columns:
+            expenses_df['Manual'] = False
         st.session_state.expenses_df = expenses_df
+        st.session_state.expenses_version = st.session_state.get('expenses_version', 0) + 1
     
     def clear_current_expenses(self):
         """Clear current expenses."""
         st.session_state.expenses_df = pd.DataFrame(columns=['Date', 'Title', 'Amount', 'Category'])
+        st.session_state.expenses_version = st.session_state.get('expenses_version', 0) + 1
+    
+    def get_current_expenses_version(self):
+        """Get a counter that changes whenever current expenses are replaced, for keying editor widgets."""
+        return st.session_state.get('expenses_version', 0)
+    
+    def apply_expense_edits(self, edits):
+        """Apply a `st.data_editor` edit delta to current expenses and return the result.
+        
+        `edits` has the editor's `edited_rows`, `added_rows` and `deleted_rows` keys, with
+        row positions relative to current expenses. Current expenses are left unchanged.
+        """
+        df = st.session_state.expenses_df
+        edited_rows = edits.get('edited_rows', {}) if edits else {}
+        added_rows = edits.get('added_rows', []) if edits else []
+        deleted_rows = edits.get('deleted_rows', []) if edits else []
+        if not (edited_rows or added_rows or deleted_rows):
+            return df
+        
+        df = df.copy()
+        for position, changes in edited_rows.items():
+            label = df.index[int(position)]
+            for column, value in changes.items():
+                df.at[label, column] = value
+            # A hand-picked category must survive later recategorization
+            if 'Category' in changes:
+                df.at[label, 'Manual'] = True
+        
+        if deleted_rows:
+            df = df.drop(index=df.index[list(deleted_rows)])
+        
+        added = pd.DataFrame([row for row in added_rows if any(value is not None for value in row.values())])
+        if not added.empty:
+            added['Manual'] = 'Category' in added.columns
+            df = pd.concat([df, added], ignore_index=True)
+        
+        # The editor reports dates as ISO strings
+        df['Date'] = pd.to_datetime(df['Date']).dt.date
+        df['Category'] = df['Category'].fillna('Other')
+        return df.reset_index(drop=True)
+    
+    def save_expense_edits(self, edits):
+        """Apply a `st.data_editor` edit delta to current expenses and save them to final expenses."""
+        return self.save_expenses_to_final(self.apply_expense_edits(edits))
     
     def get_final_expenses(self):
         """Get final confirmed expenses."""
@@ -149,94 +234,374 @@ class DataManager:
             # Ensure Category column exists
             if 'Category' not in expenses_df.columns:
                 expenses_df['Category'] = 'Other'
+            # Rows without an explicit flag were categorized by the rules
+            if 'Manual' not in expenses_df.columns:
+                expenses_df['Manual'] = False
             
-            # Add to final expenses
-            st.session_state.final_expenses = pd.concat([st.session_state.final_expenses, expenses_df], ignore_index=True)
-            
-            # Remove duplicates based on all columns
-            st.session_state.final_expenses = st.session_state.final_expenses.drop_duplicates().reset_index(drop=True)
-            
-            # Save to password-protected Excel
-            self._save_to_encrypted_csv()
+            # Hold the ledger lock from syncing to logging, so no other writer gets in between
+            with self.store.lock():
+                # Pick up rows other sessions saved so the write doesn't drop them
+                self.sync_changes()
+                final_df = st.session_state.final_expenses
+                
+                # Remove duplicates of already saved or repeated transactions, and give the rest IDs
+                new_rows = self.store.unsaved_rows(expenses_df, final_df)
+                
+                # Link conversion fees to the ID of their charge, whether it is saved now or was before
+                if 'Parent Row' in new_rows.columns:
+                    new_rows['Parent ID'] = self._parent_ids(expenses_df, new_rows, final_df)
+                new_rows = LedgerStore.with_currency_columns(new_rows.drop(columns=['Row', 'Parent Row'], errors='ignore'))
+                
+                if not new_rows.empty:
+                    self._commit_change({'op': 'append', 'rows': new_rows.reset_index(drop=True)})
             return True
         except Exception as e:
             st.error(f"Error saving expenses: {str(e)}")
             return False
     
-    def _save_to_encrypted_csv(self):
-        """Save final expenses to password-protected Excel file."""
+    def _parent_ids(self, expenses_df, new_rows, final_df):
+        """Map the `Parent Row` (statement row number) of each new row to the ledger ID of that row."""
+        saved = pd.concat([final_df[KEY_COLUMNS + ['ID']], new_rows[KEY_COLUMNS + ['ID']]]).drop_duplicates(subset=KEY_COLUMNS)
+        positions = pd.MultiIndex.from_frame(saved[KEY_COLUMNS]).get_indexer(pd.MultiIndex.from_frame(expenses_df[KEY_COLUMNS]))
+        matched = (positions >= 0) & expenses_df['Row'].notna().to_numpy()
+        id_of_row = pd.Series(saved['ID'].to_numpy()[positions[matched]], index=expenses_df['Row'].to_numpy()[matched])
+        return new_rows['Parent Row'].map(id_of_row).astype('Int64')
+    
+    def _commit_change(self, change):
+        """Apply a change to final expenses and persist it with a single write.
+        
+        Session state is only replaced once the write succeeded, so a failed save leaves it untouched.
+        """
+        previous_df = st.session_state.final_expenses
+        previous_version = self.get_ledger_version()
+        updated_df = self.store.apply_change(previous_df, change)
+        self._save_to_encrypted_csv(updated_df, change)
+        st.session_state.final_expenses = updated_df
+        self._learn_change(previous_df, updated_df, change, previous_version)
+        self._index_change(change, updated_df, self.get_ledger_version())
+    
+    def _save_to_encrypted_csv(self, df, change):
+        """Save expenses to the ledger file and record the change for other sessions."""
         try:
-            # Create data directory if it doesn't exist
-            os.makedirs(os.path.dirname(self.expense_file_path), exist_ok=True)
-            
-            # Create a copy for saving (to avoid modifying the original)
-            save_df = st.session_state.final_expenses.copy()
-            
-            # Convert date to string for Excel storage
-            if not save_df.empty:
-                save_df['Date'] = pd.to_datetime(save_df['Date']).dt.strftime('%Y-%m-%d')
-            
-            # First save main then temp
-            save_df.to_csv(self.expense_file_path, index=False)
-            save_df.to_csv(self.expense_file_path.replace('.csv',f'{datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")}.csv'), index=False)
+            version, offset = self.store.write(df, change)
+            st.session_state.ledger_cursor = {'path': self.expense_file_path, 'version': version, 'offset': offset}
+        except Exception as e:
+            raise Exception(f"Failed to save Excel: {str(e)}")
+    
+    def update_many(self, ids, changes):
+        """Update several expenses by ID with a single write.
         
+        `changes` is either one dict of column values applied to every ID, or a list of
+        dicts aligned with `ids`.
+        """
+        try:
+            with self.store.lock():
+                self.sync_changes()
+                df = st.session_state.final_expenses
+                if isinstance(changes, dict):
+                    changes = [changes] * len(ids)
+                
+                rows = df[df['ID'].isin(ids)].set_index('ID')
+                for expense_id, updated_expense in zip(ids, changes):
+                    if expense_id not in rows.index:
+                        continue
+                    for column, value in updated_expense.items():
+                        rows.at[expense_id, column] = value
+                    # A hand-picked category must survive later recategorization
+                    if 'Category' in updated_expense and 'Manual' not in updated_expense:
+                        rows.at[expense_id, 'Manual'] = True
                 
+                if not rows.empty:
+                    self._commit_change({'op': 'update', 'rows': rows.reset_index()})
+            return True
         except Exception as e:
-            raise Exception(f"Failed to save Excel: {str(e)}")
+            st.error(f"Error updating expenses: {str(e)}")
+            return False
+    
+    def delete_many(self, ids):
+        """Delete several expenses by ID with a single write."""
+        try:
+            with self.store.lock():
+                self.sync_changes()
+                ids = [int(expense_id) for expense_id in ids]
+                if st.session_state.final_expenses['ID'].isin(ids).any():
+                    self._commit_change({'op': 'delete', 'ids': ids})
+            return True
+        except Exception as e:
+            st.error(f"Error deleting expenses: {str(e)}")
+            return False
     
+    def delete_expense(self, expense_id):
+        """Delete an expense by ID from final expenses."""
+        return self.delete_many([expense_id])
     
-    def delete_expense(self, index):
-        """Delete an expense by index from final expenses."""
+    def update_expense(self, expense_id, updated_expense):
+        """Update an expense by ID."""
+        return self.update_many([expense_id], [updated_expense])
+    
+    def recategorize_expenses(self, pdf_processor):
+        """Re-apply the current category rules to every saved expense the user hasn't categorized by hand.
+        
+        Returns a DataFrame with the number of rows moved into each category, or None on failure.
+        """
+        try:
+            with self.store.lock():
+                self.sync_changes()
+                df = st.session_state.final_expenses
+                if df.empty:
+                    return pd.DataFrame(columns=['Category', 'Changed'])
+                
+                # Same rules and learned model as a fresh import, so model-picked categories stay put
+                new_categories = pdf_processor.categorize_series(df['Title'], self.get_categorizer())
+                # Conversion fees follow the category of the charge they belong to
+                linked = df['Parent ID'].notna().to_numpy() if 'Parent ID' in df.columns else np.zeros(len(df), dtype=bool)
+                if linked.any():
+                    parent_category = pd.Series(new_categories.to_numpy(), index=df['ID']).where(~df['Manual'].to_numpy(), df['Category'].to_numpy())
+                    new_categories[linked] = df.loc[linked, 'Parent ID'].map(parent_category).fillna(new_categories[linked])
+                changed = ~df['Manual'].astype(bool) & (new_categories != df['Category'])
+                
+                counts = new_categories[changed].value_counts().rename_axis('Category').reset_index(name='Changed')
+                if changed.any():
+                    rows = df.loc[changed, ['ID', 'Category']].assign(Category=new_categories[changed])
+                    self._commit_change({'op': 'update', 'rows': rows.reset_index(drop=True)})
+            return counts
+        except Exception as e:
+            st.error(f"Error recategorizing expenses: {str(e)}")
+            return None
+    
+    def get_categorizer(self):
+        """Get the categorizer learned from final expenses, training it when it is behind the ledger."""
+        version = self.get_ledger_version()
+        cached = st.session_state.get('categorizer')
+        if cached and cached['path'] == self.expense_file_path and cached['model'].version == version:
+            return cached['model']
+        
+        model = None
+        # Another session may already have saved a model for this ledger version
+        if os.path.exists(self.store.categorizer_path):
+            try:
+                model = LearnedCategorizer.load(self.store.categorizer_path)
+            except Exception:
+                model = None
+        if model is None or model.version != version:
+            model = LearnedCategorizer.from_ledger(st.session_state.final_expenses, version)
+            try:
+                model.save(self.store.categorizer_path)
+            except OSError:
+                pass  # The model is rebuilt from the ledger whenever the file is missing
+        
+        st.session_state.categorizer = {'path': self.expense_file_path, 'model': model}
+        return model
+    
+    def _learn_change(self, previous_df, updated_df, change, previous_version):
+        """Update the cached categorizer with a committed change instead of retraining it from scratch."""
+        cached = st.session_state.get('categorizer')
+        if not cached or cached['path'] != self.expense_file_path or cached['model'].version != previous_version:
+            return  # Not loaded or already stale; get_categorizer retrains it when needed
+        
+        model = cached['model']
+        try:
+            if change['op'] == 'append':
+                model.partial_fit(change['rows']['Title'], change['rows']['Category'])
+            else:
+                ids = change['rows']['ID'] if change['op'] == 'update' else change['ids']
+                # Unlearn the rows as they were, then learn them as they are now
+                old_rows = previous_df[previous_df['ID'].isin(ids)]
+                model.partial_fit(old_rows['Title'], old_rows['Category'], weight=-1.0)
+                new_rows = updated_df[updated_df['ID'].isin(ids)]
+                model.partial_fit(new_rows['Title'], new_rows['Category'])
+            model.version = self.get_ledger_version()
+            model.save(self.store.categorizer_path)
+        except Exception:
+            # Saving the ledger succeeded; drop the model so it is retrained from the ledger
+            st.session_state.pop('categorizer', None)
+    
+    def get_accounts(self):
+        """Get the {account: ledger path} mapping of the registered ledgers, including the one in use."""
+        accounts = self.registry.accounts()
+        if self.registry.account_for(self.expense_file_path) is None:
+            # The ledger in use always takes part, under its file name unless that is taken
+            name = self.store.account if self.store.account not in accounts else self.expense_file_path
+            accounts[name] = self.expense_file_path
+        return accounts
+    
+    def get_active_account(self):
+        """Get the account name of the ledger in use."""
+        target = os.path.abspath(self.expense_file_path)
+        return next(name for name, path in self.get_accounts().items() if os.path.abspath(path) == target)
+    
+    def register_account(self, account, expense_file_path=None):
+        """Register a ledger file (the one in use by default) under an account name."""
         try:
-            st.session_state.final_expenses = st.session_state.final_expenses.drop(index).reset_index(drop=True)
-            self._save_to_encrypted_excel()
+            self.registry.register(account, expense_file_path or self.expense_file_path)
             return True
         except Exception as e:
-            st.error(f"Error deleting expense: {str(e)}")
+            st.error(f"Error registering account: {str(e)}")
             return False
     
-    def update_expense(self, index, updated_expense):
-        """Update an expense at given index."""
+    def unregister_account(self, account):
+        """Stop tracking an account in the unified view."""
         try:
-            for column in updated_expense.keys():
-                st.session_state.final_expenses.loc[index, column] = updated_expense[column]
-            self._save_to_encrypted_excel()
+            self.registry.unregister(account)
             return True
         except Exception as e:
-            st.error(f"Error updating expense: {str(e)}")
+            st.error(f"Error removing account: {str(e)}")
             return False
     
+    def _account_ledgers(self):
+        """Return {account: {'path', 'version', 'df'}} for every account.
+        
+        The ledger in use comes from session state; the others are loaded in parallel and only
+        reloaded once their change log moves on. Accounts whose ledger can't be loaded are left
+        out, with the error kept in `account_load_errors` (see get_loaded_accounts).
+        """
+        accounts = self.get_accounts()
+        active = self.get_active_account()
+        others = {account: path for account, path in accounts.items() if account != active}
+        errors = {}
+        try:
+            st.session_state.account_ledgers = self.registry.load(others, st.session_state.get('account_ledgers'), errors)
+        except Exception as e:
+            errors = {account: e for account in others}
+            st.session_state.account_ledgers = {}
+        st.session_state.account_load_errors = errors
+        
+        ledgers = dict(st.session_state.account_ledgers)
+        ledgers[active] = {'path': self.expense_file_path, 'version': self.get_ledger_version(), 'df': st.session_state.final_expenses}
+        return ledgers
+    
+    def get_loaded_accounts(self, accounts):
+        """Return the given accounts whose ledger could be loaded, warning about the others."""
+        ledgers = self._account_ledgers()
+        for account, error in st.session_state.account_load_errors.items():
+            if account in accounts:
+                st.sidebar.warning(f"⚠️ Skipping account '{account}': its ledger could not be loaded ({str(error)})")
+        return [account for account in accounts if account in ledgers]
+    
+    def get_unified_expenses(self, accounts=None):
+        """Get the final expenses of several accounts (all by default) as one frame with an `Account` column, in the base currency."""
+        if accounts is None:
+            accounts = list(self.get_accounts())
+        return self.cached_for_ledger('unified', lambda ledger: ledger, accounts)
+    
+    def to_base_currency(self, expenses_df):
+        """Return a ledger frame with `Amount` converted into the base currency using the local FX rate table.
+        
+        Converted rows keep what was entered in `Original Currency` and `Original Amount`. Rows
+        without a known rate for their currency and date are left out, and counted per currency
+        in `attrs['missing_fx_rates']` so pages can say so.
+        """
+        fx_rates = FxRates.load()
+        if 'Currency' not in expenses_df.columns or (expenses_df['Currency'] == fx_rates.base_currency).all():
+            return expenses_df
+        amounts = fx_rates.to_base(expenses_df['Amount'], expenses_df['Currency'], expenses_df['Date'])
+        is_foreign = (expenses_df['Currency'] != fx_rates.base_currency).to_numpy()
+        converted = expenses_df.assign(
+            Amount=amounts.round(2),
+            Currency=fx_rates.base_currency,
+            **{'Original Currency': expenses_df['Original Currency'].mask(is_foreign, expenses_df['Currency']),
+               'Original Amount': expenses_df['Original Amount'].mask(is_foreign, expenses_df['Amount'])}
+        )
+        missing = np.isnan(amounts)
+        converted = converted[~missing].reset_index(drop=True)
+        converted.attrs['missing_fx_rates'] = expenses_df.loc[missing, 'Currency'].value_counts().to_dict()
+        return converted
+    
+    def get_search_index(self, account=None):
+        """Get the merchant search index over an account's final expenses (the one in use by default)."""
+        if account is not None and account != self.get_active_account():
+            ledger = self._account_ledgers().get(account)
+            if ledger is None:
+                # The account's ledger can't be loaded (see get_loaded_accounts); nothing to search
+                return MerchantIndex.build(LedgerStore.empty_frame(), 0)
+            indexes = st.session_state.setdefault('account_search_indexes', {})
+            cached = indexes.get(account)
+            if not cached or cached['path'] != ledger['path'] or cached['index'].version != ledger['version']:
+                cached = indexes[account] = {'path': ledger['path'], 'index': MerchantIndex.build(ledger['df'], ledger['version'])}
+            return cached['index']
+        
+        version = self.get_ledger_version()
+        cached = st.session_state.get('search_index')
+        if cached and cached['path'] == self.expense_file_path and cached['index'].version == version:
+            return cached['index']
+        
+        index = MerchantIndex.build(st.session_state.final_expenses, version)
+        st.session_state.search_index = {'path': self.expense_file_path, 'index': index}
+        return index
+    
+    def search_expenses(self, query, fuzzy=False, account=None):
+        """Return the IDs of an account's final expenses whose title matches `query`, or None for no filter (see MerchantIndex.search)."""
+        return self.get_search_index(account).search(query, fuzzy=fuzzy)
+    
+    def _index_change(self, change, updated_df, version):
+        """Apply a change to the cached search index, if it was up to date with the change's previous version."""
+        cached = st.session_state.get('search_index')
+        if cached and cached['path'] == self.expense_file_path:
+            cached['index'].apply_change(change, updated_df, version)
+    
+    def cached_for_ledger(self, name, compute, accounts=None):
+        """Return `compute(ledger)`, reusing the result until the ledger or the FX rate table changes.
+        
+        The ledger is final expenses by default, or the unified frame of `accounts` (see
+        get_unified_expenses), which is only recomputed once one of those ledgers changes.
+        Amounts are converted into the base currency first (see to_base_currency).
+        """
+        fx_signature = FxRates.load().signature
+        if accounts is None:
+            cursor = st.session_state.ledger_cursor
+            slot = ('ledger', cursor['path'])
+            key = (cursor['version'], len(st.session_state.final_expenses), fx_signature)
+            load = lambda: self.to_base_currency(st.session_state.final_expenses)
+        else:
+            ledgers = self._account_ledgers()
+            # Ledgers that can't be loaded are left out (see get_loaded_accounts)
+            accounts = sorted(account for account in accounts if account in ledgers)
+            slot = ('accounts', *accounts)
+            key = tuple((ledgers[a]['path'], ledgers[a]['version'], len(ledgers[a]['df'])) for a in accounts) + (fx_signature,)
+            load = lambda: self.to_base_currency(LedgerRegistry.unify({account: ledgers[account]['df'] for account in accounts}))
+        
+        caches = st.session_state.setdefault('ledger_cache', {})
+        cache = caches.get(slot)
+        if cache is None or cache['key'] != key:
+            # Keep the latest results of the same ledger around for incremental updates
+            previous = {**cache['previous'], **cache['values']} if cache else {}
+            cache = caches[slot] = {'key': key, 'values': {}, 'previous': previous, 'ledger': None}
+        if name not in cache['values']:
+            if cache['ledger'] is None:
+                cache['ledger'] = load()
+            cache['values'][name] = compute(cache['ledger'])
+        return cache['values'][name]
+    
+    def previous_ledger_result(self, name, accounts=None):
+        """Get the result cached under `name` for an earlier version of the ledger, if any."""
+        if accounts is None:
+            slot = ('ledger', st.session_state.ledger_cursor['path'])
+        else:
+            slot = ('accounts', *sorted(accounts))
+        cache = st.session_state.get('ledger_cache', {}).get(slot)
+        if not cache:
+            return None
+        return cache['values'].get(name, cache['previous'].get(name))
+    
     def get_expense_summary(self):
         """Get summary statistics for final expenses."""
-        df = st.session_state.final_expenses
-        if df.empty:
-            return None
-        
-        return {
-            'total_expenses': df['Amount'].sum(),
-            'average_expense': df['Amount'].mean(),
-            'transaction_count': len(df),
-            'date_range': {
-                'start': df['Date'].min(),
-                'end': df['Date'].max()
-            },
-            'categories': df['Category'].unique().tolist(),
-            'top_category': df.groupby('Category')['Amount'].sum().idxmax() if 'Category' in df.columns else 'Other',
-            'largest_expense': {
-                'amount': df['Amount'].max(),
-                'title': df.loc[df['Amount'].idxmax(), 'Title']
-            }
-        }
+        return LedgerStore.expense_summary(st.session_state.final_expenses)
     
     def get_category_summary(self):
         """Get summary by category."""
-        df = st.session_state.final_expenses
-        if df.empty or 'Category' not in df.columns:
-            return pd.DataFrame()
-        
-        return df.groupby('Category')['Amount'].agg(['sum', 'count', 'mean']).reset_index()
+        return LedgerStore.category_summary(st.session_state.final_expenses)
+    
     
     
+    def migrate_ledger(self):
+        """Convert ledger files written by older versions into the compact format (see LedgerStore.migrate)."""
+        try:
+            result = self.store.migrate()
+            self._reload_final_expenses()
+            return result
+        except Exception as e:
+            st.error(f"Error migrating ledger: {str(e)}")
+            return None
     
     def get_file_info(self):
         """Get information about the current file."""
@@ -251,5 +616,6 @@ class DataManager:
         if info['file_exists']:
             info['file_size'] = os.path.getsize(self.expense_file_path)
             info['last_modified'] = pd.Timestamp.fromtimestamp(os.path.getmtime(self.expense_file_path))
+            info['needs_migration'] = self.store.needs_migration()
         
         return info
\ No newline at end of file
@@ -0,0 +1,92 @@
+import os
+import pandas as pd
+import numpy as np
+
+BASE_CURRENCY = 'SGD'
+FX_RATES_PATH = 'data/fx_rates.csv'
+# ISO codes recognized as an original currency on statement lines
+CURRENCY_CODES = {'AUD', 'CAD', 'CHF', 'CNY', 'EUR', 'GBP', 'HKD', 'IDR', 'INR', 'JPY', 'KRW', 'MYR',
+                  'NZD', 'PHP', 'SGD', 'THB', 'TWD', 'USD', 'VND'}
+
+
+class FxRates:
+    """Date-indexed FX rates read from a local CSV file, no network access.
+
+    The file has Date, Currency and Rate columns, where Rate is the amount of base
+    currency one unit of Currency bought on that date. Conversions use the latest
+    rate on or before each date. Rates are sorted on a combined (currency, day) key,
+    so converting a whole ledger is one vectorized binary search.
+    """
+
+    _cache = {}  # (path, file signature) -> FxRates, shared by all sessions of the process
+
+    def __init__(self, rates_df, base_currency=BASE_CURRENCY, signature=None):
+        self.base_currency = base_currency
+        self.signature = signature
+        rates_df = rates_df.dropna(subset=['Date', 'Currency', 'Rate'])
+        rates_df = rates_df[rates_df['Currency'] != base_currency]
+        codes, currencies = pd.factorize(rates_df['Currency'].str.upper(), sort=True)
+        self.currency_index = pd.Index(currencies)
+        keys = self._keys(codes, self._days(rates_df['Date']))
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.codes = codes[order]
+        self.rates = rates_df['Rate'].to_numpy(dtype=float)[order]
+
+    @classmethod
+    def load(cls, path=FX_RATES_PATH, base_currency=BASE_CURRENCY):
+        """Load the rate table, reusing the parsed table until the file changes."""
+        try:
+            stat = os.stat(path)
+            signature = f'{stat.st_mtime_ns}:{stat.st_size}'
+        except OSError:
+            signature = None  # No rate table: only base-currency amounts can be converted
+
+        cache_key = (os.path.abspath(path), base_currency, signature)
+        if cache_key not in cls._cache:
+            if signature is None:
+                rates_df = pd.DataFrame(columns=['Date', 'Currency', 'Rate'])
+            else:
+                rates_df = pd.read_csv(path, usecols=['Date', 'Currency', 'Rate'])
+            # Only the latest version of each file is worth keeping
+            for key in [key for key in cls._cache if key[:2] == cache_key[:2]]:
+                del cls._cache[key]
+            cls._cache[cache_key] = cls(rates_df, base_currency, signature)
+        return cls._cache[cache_key]
+
+    def currencies(self):
+        """Currencies that can be converted, base currency first."""
+        return [self.base_currency] + [c for c in self.currency_index if c != self.base_currency]
+
+    def rate(self, currencies, dates):
+        """Rate into the base currency for each (currency, date) pair; 1 for the base currency, NaN if unknown."""
+        # Work on the few distinct currencies instead of every row's string
+        currency_codes, unique_currencies = pd.factorize(pd.Series(currencies).fillna(self.base_currency))
+        unique_currencies = pd.Index(unique_currencies).astype(str).str.upper()
+        is_base = np.asarray(unique_currencies == self.base_currency)[currency_codes]
+        codes = self.currency_index.get_indexer(unique_currencies)[currency_codes]
+        days = self._days(dates)
+
+        rates = np.full(len(codes), np.nan)
+        rates[is_base] = 1.0
+        known = (codes >= 0) & (days != np.iinfo(np.int64).min)
+        if known.any() and len(self.keys):
+            # Last rate at or before the date, as long as it is for the same currency
+            position = np.searchsorted(self.keys, self._keys(codes[known], days[known]), side='right') - 1
+            found = (position >= 0) & (self.codes[np.maximum(position, 0)] == codes[known])
+            rates[np.flatnonzero(known)[found]] = self.rates[position[found]]
+        return rates
+
+    def to_base(self, amounts, currencies, dates):
+        """Convert amounts into the base currency; NaN where no rate is known."""
+        return np.asarray(amounts, dtype=float) * self.rate(currencies, dates)
+
+    @staticmethod
+    def _days(dates):
+        """Days since the epoch of each date; missing dates become the minimum int64."""
+        return pd.to_datetime(pd.Series(dates)).to_numpy().astype('datetime64[D]').astype(np.int64)
+
+    @staticmethod
+    def _keys(codes, days):
+        """Combine currency codes and days into one sortable integer key."""
+        return (np.asarray(codes, dtype=np.int64) << 32) + days
@@ -0,0 +1,150 @@
+import os
+import re
+import pandas as pd
+import numpy as np
+
+
+class LearnedCategorizer:
+    """Multinomial naive Bayes over hashed character n-grams of expense titles.
+
+    Trained from the confirmed ledger, CPU only and without any downloads. Naive
+    Bayes is a linear model over n-gram counts whose training state is just the
+    per-category counts, so rows can be learned or unlearned incrementally as the
+    ledger changes.
+    """
+
+    def __init__(self, n_features=2 ** 18, ngram_range=(2, 4), alpha=0.1):
+        self.n_features = n_features
+        self.ngram_range = ngram_range
+        self.alpha = alpha
+        self.classes = []
+        self.feature_counts = np.zeros((0, n_features), dtype=np.float32)
+        self.class_counts = np.zeros(0, dtype=np.float64)
+        self.version = None  # Ledger version the model was trained up to
+        self._log_probs = None
+
+    @classmethod
+    def from_ledger(cls, expenses_df, version=None, **kwargs):
+        """Train a model on every confirmed row of the ledger."""
+        model = cls(**kwargs)
+        if not expenses_df.empty:
+            model.partial_fit(expenses_df['Title'], expenses_df['Category'])
+        model.version = version
+        return model
+
+    def partial_fit(self, titles, categories, weight=1.0):
+        """Add rows to the model; a negative `weight` removes rows learned before."""
+        categories = pd.Series(categories).fillna('Other').astype(str).to_numpy()
+        for category in pd.unique(categories):
+            if category not in self.classes:
+                self.classes.append(category)
+                self.feature_counts = np.vstack([self.feature_counts, np.zeros((1, self.n_features), dtype=np.float32)])
+                self.class_counts = np.append(self.class_counts, 0.0)
+        class_index = pd.Index(self.classes).get_indexer(categories)
+
+        # Hash each distinct title once and count how often it was seen per category
+        n_classes = len(self.classes)
+        title_codes, unique_titles = pd.factorize(pd.Series(titles).fillna('').astype(str))
+        title_class_counts = np.bincount(
+            title_codes * n_classes + class_index, minlength=len(unique_titles) * n_classes
+        ).reshape(len(unique_titles), n_classes)
+        rows, features = self._hash_features(pd.Series(unique_titles))
+        for c in range(n_classes):
+            self.feature_counts[c] += weight * np.bincount(
+                features, weights=title_class_counts[rows, c], minlength=self.n_features
+            ).astype(np.float32)
+        self.class_counts += weight * np.bincount(class_index, minlength=n_classes)
+        if weight < 0:
+            # Unlearning can leave tiny negative float residue
+            np.maximum(self.feature_counts, 0, out=self.feature_counts)
+            np.maximum(self.class_counts, 0, out=self.class_counts)
+        self._log_probs = None
+        return self
+
+    def predict(self, titles):
+        """
+        Predict categories for a batch of titles in one call.
+
+        Returns (categories, confidence) as Series aligned with `titles`; confidence is the
+        posterior probability of the predicted category.
+        """
+        titles = pd.Series(titles)
+        if not self.classes or titles.empty:
+            return pd.Series('Other', index=titles.index, dtype=object), pd.Series(0.0, index=titles.index)
+
+        if self._log_probs is None:
+            smoothed = self.feature_counts + self.alpha
+            self._log_probs = np.log(smoothed) - np.log(smoothed.sum(axis=1, keepdims=True))
+
+        # Score each distinct title once
+        title_codes, unique_titles = pd.factorize(titles.fillna('').astype(str))
+        rows, features = self._hash_features(pd.Series(unique_titles))
+        log_prior = np.log(self.class_counts + 1) - np.log(self.class_counts.sum() + len(self.classes))
+        scores = np.array([
+            np.bincount(rows, weights=self._log_probs[c, features], minlength=len(unique_titles))
+            for c in range(len(self.classes))
+        ]) + log_prior[:, None]
+
+        best = scores.argmax(axis=0)
+        probabilities = np.exp(scores - scores.max(axis=0))
+        confidence = probabilities[best, np.arange(len(unique_titles))] / probabilities.sum(axis=0)
+
+        predicted = np.asarray(self.classes, dtype=object)[best][title_codes]
+        return pd.Series(predicted, index=titles.index), pd.Series(confidence[title_codes], index=titles.index)
+
+    def save(self, path):
+        """Save the model next to the ledger."""
+        temp_path = path + '.tmp.npz'
+        np.savez_compressed(
+            temp_path,
+            feature_counts=self.feature_counts,
+            class_counts=self.class_counts,
+            classes=np.asarray(self.classes, dtype=str),
+            settings=np.array([self.n_features, self.ngram_range[0], self.ngram_range[1]]),
+            alpha=self.alpha,
+            version=-1 if self.version is None else self.version,
+        )
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Load a model saved with `save`."""
+        with np.load(path) as data:
+            n_features, ngram_min, ngram_max = (int(value) for value in data['settings'])
+            model = cls(n_features=n_features, ngram_range=(ngram_min, ngram_max), alpha=float(data['alpha']))
+            model.feature_counts = data['feature_counts']
+            model.class_counts = data['class_counts']
+            model.classes = data['classes'].tolist()
+            version = int(data['version'])
+        model.version = None if version < 0 else version
+        return model
+
+    def _hash_features(self, titles):
+        """
+        Hash the character n-grams of every title.
+
+        Returns (rows, features): the title position and hashed feature index of each n-gram.
+        All titles are concatenated into one byte array so hashing is vectorized with NumPy.
+        """
+        texts = [' ' + re.sub(r'\d+', '0', title.lower()) + ' ' for title in titles.fillna('').astype(str)]
+        encoded = [text.encode('utf-8') for text in texts]
+        if not encoded:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+        lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+        data = np.frombuffer(b''.join(encoded), dtype=np.uint8).astype(np.uint64)
+        title_of = np.repeat(np.arange(len(encoded)), lengths)
+        end_of = np.repeat(np.cumsum(lengths), lengths)  # End offset of each byte's title
+
+        rows, features = [], []
+        positions = np.arange(len(data))
+        mask = np.uint64(self.n_features - 1)
+        for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+            starts = positions[positions + n <= end_of]
+            h = np.full(len(starts), np.uint64(n * 0x9E3779B97F4A7C15 % 2 ** 64))  # Seed differs per n
+            for offset in range(n):
+                h = (h ^ data[starts + offset]) * np.uint64(0x100000001B3)  # FNV-1a, wraps mod 2**64
+            h ^= h >> np.uint64(29)
+            rows.append(title_of[starts])
+            features.append((h & mask).astype(np.int64))
+        return np.concatenate(rows), np.concatenate(features)
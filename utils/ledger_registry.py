@@ -0,0 +1,113 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from utils.ledger_store import LedgerStore
+
+REGISTRY_PATH = 'data/ledgers.json'
+
+
+class LedgerRegistry:
+    """The ledgers tracked together, one per account, e.g. a card or a household member.
+
+    Accounts map a name to a ledger file and are kept in a small JSON file, so every
+    session sees the same set. Ledgers are loaded in parallel on a thread pool: Arrow
+    and CSV parsing release the GIL, so loading several files overlaps the I/O and
+    parsing of each.
+    """
+
+    def __init__(self, registry_path=REGISTRY_PATH, max_workers=None):
+        self.registry_path = registry_path
+        self.max_workers = max_workers
+
+    def accounts(self):
+        """Return the registered {account: ledger path} mapping."""
+        try:
+            with open(self.registry_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def register(self, account, expense_file_path):
+        """Register (or re-point) an account's ledger file."""
+        account = account.strip()
+        if not account:
+            raise ValueError("Account name cannot be empty")
+        accounts = self.accounts()
+        for name, path in accounts.items():
+            if name != account and os.path.abspath(path) == os.path.abspath(expense_file_path):
+                raise ValueError(f"{expense_file_path} is already registered as '{name}'")
+        accounts[account] = expense_file_path
+        self._save(accounts)
+
+    def unregister(self, account):
+        """Stop tracking an account; its ledger file is left untouched."""
+        accounts = self.accounts()
+        if accounts.pop(account, None) is not None:
+            self._save(accounts)
+
+    def account_for(self, expense_file_path):
+        """Return the account registered for a ledger file, or None."""
+        target = os.path.abspath(expense_file_path)
+        return next((name for name, path in self.accounts().items() if os.path.abspath(path) == target), None)
+
+    def load(self, accounts, cached=None, errors=None):
+        """
+        Load several ledgers in parallel.
+
+        `accounts` maps account names to ledger paths. `cached` is a previous result; ledgers
+        whose change log has not moved on since are reused instead of reloaded. Returns
+        {account: {'path', 'version', 'df'}}. A ledger that fails to load is left out, and its
+        exception is put in the `errors` dict when one is given.
+        """
+        cached = cached or {}
+        result = {}
+        to_load = {}
+        for account, path in accounts.items():
+            store = LedgerStore(path, account)
+            version, _ = store.head()
+            previous = cached.get(account)
+            if previous and previous['path'] == path and previous['version'] == version:
+                result[account] = previous
+            else:
+                to_load[account] = (store, version)
+
+        if to_load:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                frames = pool.map(self._try_load_store, [store for store, _ in to_load.values()])
+                for (account, (store, version)), (df, error) in zip(to_load.items(), frames):
+                    if error is not None:
+                        if errors is not None:
+                            errors[account] = error
+                        continue
+                    result[account] = {'path': store.expense_file_path, 'version': version, 'df': df}
+        return result
+
+    @staticmethod
+    def unify(frames):
+        """Concatenate {account: ledger frame} into one frame with an `Account` column; IDs are unique per account."""
+        parts = [df.assign(Account=account) for account, df in frames.items()]
+        if not parts:
+            return LedgerStore.empty_frame().assign(Account=pd.Series(dtype=object))
+        return pd.concat(parts, ignore_index=True)
+
+    @staticmethod
+    def _load_store(store):
+        """Load one ledger, or an empty frame if the file doesn't exist yet."""
+        return store.load() if store.exists() else LedgerStore.empty_frame()
+
+    @classmethod
+    def _try_load_store(cls, store):
+        """Return (frame, None) for a ledger, or (None, exception) if it can't be loaded."""
+        try:
+            return cls._load_store(store), None
+        except Exception as e:
+            return None, e
+
+    def _save(self, accounts):
+        """Write the registry atomically."""
+        os.makedirs(os.path.dirname(self.registry_path) or '.', exist_ok=True)
+        temp_path = self.registry_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(accounts, f, indent=2)
+        os.replace(temp_path, self.registry_path)
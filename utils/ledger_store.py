@@ -0,0 +1,561 @@
+import contextlib
+import csv
+import glob
+import json
+import os
+import threading
+import datetime
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.feather as feather
+from utils.fx_rates import BASE_CURRENCY
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+LEDGER_COLUMNS = ['ID', 'Date', 'Title', 'Amount', 'Category', 'Manual',
+                  'Currency', 'Original Currency', 'Original Amount', 'Parent ID']
+# Columns that identify a transaction when de-duplicating saved statements
+KEY_COLUMNS = ['Date', 'Title', 'Amount', 'Category']
+# Stored column types, so ledger CSVs are parsed without type inference
+CSV_COLUMN_TYPES = {
+    'ID': pa.int64(), 'Date': pa.date32(), 'Title': pa.string(), 'Amount': pa.float64(),
+    'Category': pa.string(), 'Manual': pa.bool_(), 'Currency': pa.string(),
+    'Original Currency': pa.string(), 'Original Amount': pa.float64(), 'Parent ID': pa.int64(),
+}
+# CSV bytes parsed per chunk when streaming a ledger into Arrow
+CSV_BLOCK_SIZE = 16 * 1024 * 1024
+# Timestamp suffix of snapshot files, e.g. final_expenses2024-05-01_12-30-00.arrow
+SNAPSHOT_SUFFIX = '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]_[0-9][0-9]-[0-9][0-9]-[0-9][0-9]'
+# Lock files held by the current thread, so nested lock() calls don't wait on themselves
+_held_locks = threading.local()
+
+
+class LedgerStore:
+    """File-backed storage for the confirmed expense ledger.
+
+    The ledger itself lives in a CSV file. Every write also appends an entry to a
+    JSON-lines change log next to it, so sessions can poll a monotonically
+    increasing version and apply only the deltas they have not seen yet.
+
+    An uncompressed Arrow IPC (Feather v2) copy of the parsed ledger is kept as a
+    sidecar and opened through a memory map, so loads skip CSV parsing and
+    processes reading the same ledger share its pages through the OS cache. When
+    the sidecar is stale the CSV is streamed into it in typed chunks, so even
+    ledgers larger than memory are converted without holding them as a whole.
+
+    Appended rows are appended to the CSV; other writes rewrite it and also keep a
+    timestamped, zstd-compressed Arrow snapshot of the ledger.
+
+    Writers hold lock() from syncing with the change log until their change is logged,
+    so sessions and processes sharing a ledger never write over each other's changes.
+    """
+
+    def __init__(self, expense_file_path, account=None):
+        self.expense_file_path = expense_file_path
+        base_path = self.base_path = os.path.splitext(expense_file_path)[0]
+        # The account this ledger belongs to, named after the file unless registered otherwise
+        self.account = account or os.path.basename(base_path)
+        self.changelog_path = base_path + '.changes.jsonl'
+        self.arrow_path = base_path + '.arrow'
+        self.categorizer_path = base_path + '.categorizer.npz'
+        self.lock_path = base_path + '.lock'
+
+    def exists(self):
+        """Check whether the ledger file exists."""
+        return os.path.exists(self.expense_file_path)
+
+    @staticmethod
+    def empty_frame():
+        """Return an empty ledger frame with the stored column types."""
+        return pd.DataFrame({
+            'ID': pd.Series(dtype='int64'),
+            'Date': pd.Series(dtype=object),
+            'Title': pd.Series(dtype=object),
+            'Amount': pd.Series(dtype='float64'),
+            'Category': pd.Series(dtype=object),
+            'Manual': pd.Series(dtype=bool),
+            'Currency': pd.Series(dtype=object),
+            'Original Currency': pd.Series(dtype=object),
+            'Original Amount': pd.Series(dtype='float64'),
+            'Parent ID': pd.Series(dtype='Int64'),
+        })
+
+    @staticmethod
+    def with_currency_columns(df):
+        """Fill in the currency columns of rows that don't have them, in place.
+
+        `Currency` is the currency of `Amount`; foreign charges also keep the `Original Currency`
+        and `Original Amount` they were made in, and conversion fees the `Parent ID` of their charge.
+        """
+        if 'Currency' not in df.columns:
+            df['Currency'] = BASE_CURRENCY
+        else:
+            df['Currency'] = df['Currency'].fillna(BASE_CURRENCY)
+        if 'Original Currency' not in df.columns:
+            df['Original Currency'] = None
+        if 'Original Amount' not in df.columns:
+            df['Original Amount'] = np.nan
+        df['Original Amount'] = df['Original Amount'].astype('float64')
+        df['Parent ID'] = df['Parent ID'].astype('Int64') if 'Parent ID' in df.columns else pd.array([pd.NA] * len(df), dtype='Int64')
+        return df
+
+    def load(self):
+        """Load the full ledger into a DataFrame with `Date` as python dates.
+
+        Reads the memory-mapped Arrow sidecar when it matches the CSV, otherwise
+        regenerates the sidecar from the CSV first.
+        """
+        df = self._load_arrow()
+        if df is None and self._csv_to_arrow(self.expense_file_path, self.arrow_path, {b'ledger_csv': self._csv_signature()}):
+            df = self._load_arrow()
+        if df is not None:
+            # Sidecars written before the currency columns existed
+            return df if set(LEDGER_COLUMNS) <= set(df.columns) else self.with_currency_columns(df)
+
+        # CSVs the typed reader can't parse, e.g. dates in another format, go through type inference
+        df = pd.read_csv(self.expense_file_path)
+        if 'ID' in df.columns and df['ID'].isna().any():
+            # Rows added by hand without an ID get new ones, saved so they don't change on the next load
+            with self.lock():
+                df = self._normalize(pd.read_csv(self.expense_file_path), self.next_id(self.empty_frame()))
+                return self._write_csv(df)
+        df = self._normalize(df)
+        self._write_arrow(df)
+        return df
+
+    @contextlib.contextmanager
+    def lock(self):
+        """Hold the ledger's exclusive write lock, across threads and processes, for a `with` block.
+
+        Inside the block, read changes_since() before building a change, so it is based on
+        every change logged so far, then write() it. A thread already holding the lock
+        can enter it again.
+        """
+        held = _held_locks.__dict__.setdefault('paths', set())
+        key = os.path.abspath(self.lock_path)
+        if key in held:
+            yield
+            return
+        os.makedirs(os.path.dirname(self.lock_path) or '.', exist_ok=True)
+        # Each call opens its own file, so threads of one process exclude each other too
+        with open(self.lock_path, 'a+b') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            held.add(key)
+            try:
+                yield
+            finally:
+                held.discard(key)
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def write(self, df, change):
+        """Persist the full ledger and record `change` in the change log.
+
+        `change` is a dict with an `op` key: 'append' or 'update' with `rows`,
+        'delete' with `ids`, or 'reset'. Returns the new (version, offset) cursor.
+        Call it while holding lock().
+
+        An 'append' only appends its rows to the CSV, so saving a statement costs time in
+        proportion to the statement, not the ledger. The Arrow sidecar is then rebuilt by
+        the next full load; sessions already running apply the change from the log.
+        """
+        os.makedirs(os.path.dirname(self.expense_file_path) or '.', exist_ok=True)
+        if change['op'] == 'append' and self._append_csv(change['rows']):
+            return self._append_change(change, self.next_id(change['rows']) - 1)
+
+        # First save main then timestamped snapshot
+        df = self._write_csv(df)
+        self._write_snapshot(df)
+
+        return self._append_change(change, self.next_id(df) - 1)
+
+    def next_id(self, df):
+        """The first ID for new rows of ledger `df`, call it while holding lock().
+
+        IDs of deleted rows are never handed out again, so links to them (like a fee's
+        `Parent ID`) can't end up pointing at an unrelated row. The highest ID ever
+        allocated is kept in every change log entry.
+        """
+        entry = self._last_entry()
+        logged = int(entry.get('max_id', 0)) if entry else 0
+        return max(logged, int(df['ID'].max()) if not df.empty else 0) + 1
+
+    def legacy_snapshots(self):
+        """Timestamped snapshots still stored as CSV, from before snapshots were compressed."""
+        return sorted(glob.glob(glob.escape(self.base_path) + SNAPSHOT_SUFFIX + '.csv'))
+
+    def needs_migration(self):
+        """Check whether the ledger still has files in a format written by older versions."""
+        if self.legacy_snapshots():
+            return True
+        if not self.exists():
+            return False
+        with open(self.expense_file_path, encoding='utf-8') as f:
+            header = f.readline().strip().split(',')
+        return not set(LEDGER_COLUMNS) <= set(header)
+
+    def migrate(self):
+        """Convert a ledger written by older versions into the current, compact format, once.
+
+        A CSV without IDs or the newer columns is rewritten with them, so the IDs sessions
+        assign on load are the ones stored. CSV snapshots are streamed into compressed
+        Arrow files and removed. The change log is left alone: the ledger's rows don't change.
+        Returns {'snapshots', 'csv_bytes', 'arrow_bytes'} for the converted snapshots.
+        """
+        if self.needs_migration() and self.exists():
+            with self.lock():
+                self._write_csv(self.load())
+
+        result = {'snapshots': 0, 'csv_bytes': 0, 'arrow_bytes': 0}
+        for csv_path in self.legacy_snapshots():
+            arrow_path = os.path.splitext(csv_path)[0] + '.arrow'
+            try:
+                if not self._csv_to_arrow(csv_path, arrow_path, compression='zstd'):
+                    feather.write_feather(self._normalize(pd.read_csv(csv_path)), arrow_path, compression='zstd')
+            except (OSError, ValueError, pa.ArrowException):
+                continue  # Keep snapshots that can't be read as they are
+            result['snapshots'] += 1
+            result['csv_bytes'] += os.path.getsize(csv_path)
+            result['arrow_bytes'] += os.path.getsize(arrow_path)
+            os.remove(csv_path)
+        return result
+
+    def head(self):
+        """Return the (version, offset) cursor for the end of the change log."""
+        entry, offset = self._last_entry(with_offset=True)
+        return (entry['version'] if entry else 0), offset
+
+    def changes_since(self, version, offset=0):
+        """Return (changes, new_version, new_offset) for entries newer than `version`.
+
+        `offset` is a byte position in the change log from a previous call; when
+        the log has not grown past it this is a single `stat` call. If the log was
+        truncated or replaced, a single 'reset' change is returned so the caller
+        reloads the whole ledger.
+        """
+        try:
+            size = os.path.getsize(self.changelog_path)
+        except OSError:
+            size = 0
+
+        if size == offset:
+            return [], version, offset
+        if size < offset:
+            new_version, new_offset = self.head()
+            return [{'op': 'reset', 'version': new_version}], new_version, new_offset
+
+        changes = []
+        with open(self.changelog_path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # Partially written entry, pick it up on the next poll
+                offset += len(line)
+                entry = json.loads(line)
+                if entry['version'] > version:
+                    changes.append(entry)
+                    version = entry['version']
+        return changes, version, offset
+
+    def replay(self, df, changes):
+        """Apply change log entries from changes_since() to ledger frame `df`.
+
+        Returns (ledger, changes with their rows as frames), or (None, None) if a change
+        can only be applied by reloading the whole ledger.
+        """
+        parsed = []
+        for change in changes:
+            if change['op'] in ('append', 'update'):
+                change = {**change, 'rows': self.rows_to_frame(change['rows'])}
+                if change['op'] == 'append':
+                    # Rows logged before the currency columns existed
+                    self.with_currency_columns(change['rows'])
+            elif change['op'] != 'delete':
+                return None, None
+            df = self.apply_change(df, change)
+            parsed.append(change)
+        return df, parsed
+
+    def unsaved_rows(self, rows, df):
+        """Return `rows` without repeats and rows already saved in ledger `df`, with new IDs.
+
+        Rows are matched on KEY_COLUMNS. Call it while holding lock(), so the IDs stay unique.
+        """
+        new_rows = rows.drop_duplicates(subset=KEY_COLUMNS)
+        if not df.empty:
+            existing = pd.MultiIndex.from_frame(df[KEY_COLUMNS])
+            new_rows = new_rows[~pd.MultiIndex.from_frame(new_rows[KEY_COLUMNS]).isin(existing)]
+
+        # IDs are stable: never reused or shifted
+        next_id = self.next_id(df)
+        new_rows = new_rows.drop(columns='ID', errors='ignore')
+        new_rows.insert(0, 'ID', range(next_id, next_id + len(new_rows)))
+        return new_rows
+
+    def rows_to_frame(self, rows):
+        """Convert change log rows (full or partial records) back into a DataFrame."""
+        df = pd.DataFrame(rows)
+        if 'ID' in df.columns:
+            df['ID'] = df['ID'].astype('int64')
+        if 'Date' in df.columns:
+            df['Date'] = pd.to_datetime(df['Date']).dt.date
+        if 'Original Amount' in df.columns:
+            df['Original Amount'] = df['Original Amount'].astype('float64')
+        if 'Parent ID' in df.columns:
+            df['Parent ID'] = df['Parent ID'].astype('Int64')
+        return df
+
+    @staticmethod
+    def to_records(rows):
+        """Convert ledger rows into JSON-ready records, the inverse of rows_to_frame."""
+        rows = rows[[c for c in LEDGER_COLUMNS if c in rows.columns]].copy()
+        if not rows.empty and 'Date' in rows.columns:
+            rows['Date'] = pd.to_datetime(rows['Date']).dt.strftime('%Y-%m-%d')
+        # Missing values (NaN, NA) become None, i.e. JSON null
+        rows = rows.astype(object).where(rows.notna(), None)
+        return rows.to_dict(orient='records')
+
+    @staticmethod
+    def expense_summary(df):
+        """Summary statistics of a ledger frame, or None if it is empty."""
+        if df.empty:
+            return None
+
+        return {
+            'total_expenses': df['Amount'].sum(),
+            'average_expense': df['Amount'].mean(),
+            'transaction_count': len(df),
+            'date_range': {
+                'start': df['Date'].min(),
+                'end': df['Date'].max()
+            },
+            'categories': df['Category'].unique().tolist(),
+            'top_category': df.groupby('Category')['Amount'].sum().idxmax() if 'Category' in df.columns else 'Other',
+            'largest_expense': {
+                'amount': df['Amount'].max(),
+                'title': df.loc[df['Amount'].idxmax(), 'Title']
+            }
+        }
+
+    @staticmethod
+    def category_summary(df):
+        """Total, count and mean amount per category of a ledger frame."""
+        if df.empty or 'Category' not in df.columns:
+            return pd.DataFrame()
+
+        return df.groupby('Category')['Amount'].agg(['sum', 'count', 'mean']).reset_index()
+
+    @staticmethod
+    def apply_change(df, change):
+        """Return a new ledger frame with an 'append', 'update' or 'delete' change applied."""
+        op = change['op']
+        if op == 'append':
+            if df.empty:
+                return change['rows'].reset_index(drop=True)
+            return pd.concat([df, change['rows']], ignore_index=True).drop_duplicates(subset='ID').reset_index(drop=True)
+        if op == 'update':
+            rows = change['rows']
+            df = df.copy()
+            positions = pd.Index(df['ID']).get_indexer(rows['ID'])
+            found = positions >= 0
+            for column in rows.columns.intersection(df.columns):
+                df.iloc[positions[found], df.columns.get_loc(column)] = rows[column].to_numpy()[found]
+            return df
+        if op == 'delete':
+            return df[~df['ID'].isin(change['ids'])].reset_index(drop=True)
+        raise ValueError(f"Cannot apply '{op}' change in place")
+
+    def _csv_signature(self):
+        """Identify the current CSV contents by modification time and size."""
+        stat = os.stat(self.expense_file_path)
+        return f'{stat.st_mtime_ns}:{stat.st_size}'.encode()
+
+    def _write_csv(self, df):
+        """Write the ledger CSV and its Arrow sidecar; returns the frame with columns in stored order."""
+        # Keep the ledger columns first and in a fixed order
+        columns = [c for c in LEDGER_COLUMNS if c in df.columns] + [c for c in df.columns if c not in LEDGER_COLUMNS]
+        save_df = df[columns].copy()
+        # Convert date to string for CSV storage
+        if not save_df.empty:
+            save_df['Date'] = pd.to_datetime(save_df['Date']).dt.strftime('%Y-%m-%d')
+
+        save_df.to_csv(self.expense_file_path, index=False)
+        self._write_arrow(df[columns])
+        return df[columns]
+
+    def _append_csv(self, rows):
+        """Append rows to the ledger CSV; False, leaving it untouched, if its columns don't fit them."""
+        if not self.exists():
+            return False
+        with open(self.expense_file_path, 'rb+') as f:
+            header = next(csv.reader([f.readline().decode('utf-8')]), [])
+            if not set(LEDGER_COLUMNS) <= set(header) or not set(rows.columns) <= set(header):
+                return False  # Older layout or new columns: the whole file is rewritten instead
+            # Files edited by hand may lack the final newline
+            if f.seek(0, os.SEEK_END) and (f.seek(-1, os.SEEK_END), f.read(1))[1] != b'\n':
+                f.write(b'\n')
+
+        save_df = rows.reindex(columns=header)
+        if not save_df.empty:
+            save_df['Date'] = pd.to_datetime(save_df['Date']).dt.strftime('%Y-%m-%d')
+        save_df.to_csv(self.expense_file_path, mode='a', header=False, index=False)
+        return True
+
+    def _write_snapshot(self, df):
+        """Keep a timestamped copy of the ledger; compressed, as it is only read to restore."""
+        snapshot_path = f'{self.base_path}{datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")}.arrow'
+        feather.write_feather(pa.Table.from_pandas(df, preserve_index=False), snapshot_path, compression='zstd')
+
+    def _csv_to_arrow(self, csv_path, arrow_path, metadata=None, compression='uncompressed'):
+        """Stream a ledger CSV into an Arrow file one typed chunk at a time.
+
+        Returns False, leaving `arrow_path` untouched, if the CSV doesn't parse with the
+        stored column types.
+        """
+        temp_path = arrow_path + '.tmp'
+        writer = None
+        try:
+            reader = pa_csv.open_csv(
+                csv_path,
+                read_options=pa_csv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+                convert_options=pa_csv.ConvertOptions(column_types=CSV_COLUMN_TYPES, strings_can_be_null=True)
+            )
+            next_id = 1
+            for batch in reader:
+                if 'ID' in batch.schema.names and batch.column('ID').null_count:
+                    raise ValueError("Rows without an ID")  # Numbered by load() from the whole ledger
+                df = self._normalize(batch.to_pandas(), next_id)
+                next_id += len(df)
+                if writer is None:
+                    # Pandas metadata restores types like Int64; ledger columns keep their types even when all null
+                    schema = pa.Schema.from_pandas(df, preserve_index=False)
+                    for name, column_type in CSV_COLUMN_TYPES.items():
+                        if name in schema.names:
+                            schema = schema.set(schema.get_field_index(name), pa.field(name, column_type))
+                    schema = schema.with_metadata({**schema.metadata, **(metadata or {})})
+                    writer = pa.ipc.new_file(temp_path, schema, options=pa.ipc.IpcWriteOptions(
+                        compression=None if compression == 'uncompressed' else compression))
+                writer.write_batch(pa.RecordBatch.from_pandas(df, schema=schema, preserve_index=False))
+            if writer is None:
+                return False  # Header only; pandas gives the empty ledger its columns
+            writer.close()
+            os.replace(temp_path, arrow_path)
+            return True
+        except (OSError, ValueError, TypeError, pa.ArrowException):
+            if writer is not None:
+                writer.close()
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return False
+
+    def _load_arrow(self):
+        """Load the Arrow sidecar through a memory map, or None if it is missing or stale."""
+        try:
+            # The map is released once no column references its pages any more
+            reader = pa.ipc.open_file(pa.memory_map(self.arrow_path))
+            metadata = reader.schema.metadata or {}
+            if metadata.get(b'ledger_csv') != self._csv_signature():
+                return None
+            # Numeric columns stay views of the mapped pages, dates come back as python dates
+            return reader.read_all().to_pandas(split_blocks=True)
+        except (OSError, pa.ArrowInvalid):
+            return None
+
+    def _write_arrow(self, df):
+        """Write the Arrow sidecar for the CSV as it is on disk now."""
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), b'ledger_csv': self._csv_signature()})
+            # Write then rename, so processes mapping the old sidecar keep a consistent file
+            temp_path = self.arrow_path + '.tmp'
+            feather.write_feather(table, temp_path, compression='uncompressed')
+            os.replace(temp_path, self.arrow_path)
+        except (OSError, pa.ArrowException):
+            pass  # The sidecar is only a cache; load() falls back to the CSV
+
+    def _last_entry(self, with_offset=False):
+        """Return the last complete change log entry (None if there is none), and the offset just past it if asked."""
+        entry, offset = None, 0
+        if os.path.exists(self.changelog_path):
+            with open(self.changelog_path, 'rb') as f:
+                last_line, offset = self._read_last_line(f, f.seek(0, os.SEEK_END))
+            entry = json.loads(last_line) if last_line else None
+        return (entry, offset) if with_offset else entry
+
+    def _append_change(self, change, max_id):
+        """Append a versioned entry to the change log, with the highest row ID allocated so far."""
+        version, _ = self.head()
+        entry = {'version': version + 1, 'max_id': max_id, **change}
+        if 'rows' in entry:
+            entry['rows'] = self.to_records(entry['rows'])
+        with open(self.changelog_path, 'ab') as f:
+            f.write((json.dumps(entry, default=str) + '\n').encode('utf-8'))
+            offset = f.tell()
+        return entry['version'], offset
+
+    @staticmethod
+    def _read_last_line(f, end):
+        """Read the last complete line of an open binary file; returns (line, offset just past it).
+
+        A trailing line without a newline is an entry still being written and is left for
+        later, as changes_since does.
+        """
+        chunk_size = 4096
+        pos = end
+        data = b''
+        while pos > 0:
+            step = min(chunk_size, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+            complete = data[:data.rfind(b'\n') + 1]
+            lines = complete.rstrip(b'\n').split(b'\n')
+            if complete.strip() and (len(lines) > 1 or pos == 0):
+                return lines[-1].strip(), pos + len(complete)
+        return b'', 0
+
+    @staticmethod
+    def _normalize(df, first_id=1):
+        """Apply the in-memory ledger conventions to a loaded frame; rows without an ID are numbered from `first_id` on."""
+        # Typed reads already give python dates
+        if not df.empty and type(df['Date'].iloc[0]) is not datetime.date:
+            df['Date'] = pd.to_datetime(df['Date']).dt.date
+
+        # Add Category column if it doesn't exist (for backward compatibility)
+        if 'Category' not in df.columns:
+            df['Category'] = 'Other'
+        # Older ledgers have no row IDs; number them in file order
+        if 'ID' not in df.columns:
+            df.insert(0, 'ID', range(first_id, first_id + len(df)))
+        missing = df['ID'].isna()
+        if missing.any():
+            # Rows added by hand come after every other row's ID
+            start = max(first_id, int(df['ID'].max()) + 1 if not missing.all() else first_id)
+            df.loc[missing, 'ID'] = range(start, start + int(missing.sum()))
+        df['ID'] = df['ID'].astype('int64')
+        if 'Manual' not in df.columns:
+            # Older ledgers had no flag, but their editor let users pick categories: a category
+            # other than 'Other' that the current rules don't give must have been picked by hand.
+            # Imported on first use; the rules come with the Streamlit side of the app
+            from utils.pdf_processor import PDFProcessor
+            # Titles repeat a lot; only the unique ones are matched
+            codes, titles = pd.factorize(df['Title'], use_na_sentinel=False)
+            rules = PDFProcessor().categorize_series(pd.Series(titles)).to_numpy()[codes]
+            df['Manual'] = (df['Category'].notna() & (df['Category'] != 'Other') & (df['Category'] != rules)).to_numpy(dtype=bool)
+        else:
+            df['Manual'] = df['Manual'].fillna(False).astype(bool)
+        # Older ledgers were single-currency
+        return LedgerStore.with_currency_columns(df)
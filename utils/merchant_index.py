@@ -0,0 +1,203 @@
+from bisect import bisect_left
+import pandas as pd
+import numpy as np
+from utils.merchants import title_tokens
+
+
+def _trigrams(token):
+    """Padded character trigrams of a token, e.g. 'grab' -> {'  g', ' gr', 'gra', 'rab', 'ab '}."""
+    padded = f'  {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class MerchantIndex:
+    """Inverted index from title tokens to ledger row IDs, for prefix and fuzzy merchant search.
+
+    The bulk of the index is a sorted token vocabulary with the row IDs of each token
+    stored contiguously (CSR layout), so every token sharing a prefix maps to one slice
+    of the postings. Saved changes go into a small in-memory delta, plus a set of IDs
+    whose main postings are outdated; both are merged into the main index once they grow
+    past `compact_at` rows. Fuzzy lookups compare token trigrams, like pg_trgm.
+    """
+
+    def __init__(self, fuzzy_threshold=0.4, compact_at=5000):
+        self.fuzzy_threshold = fuzzy_threshold
+        self.compact_at = compact_at
+        self.tokens = []  # Sorted vocabulary of the main index
+        self.posting_offsets = np.zeros(1, dtype=np.int64)
+        self.posting_ids = np.zeros(0, dtype=np.int64)
+        self.stale_ids = set()  # IDs whose main postings were updated or deleted
+        self.delta = {}  # Token -> set of IDs saved since the last compaction
+        self.delta_tokens = {}  # ID -> tokens, to undo delta entries
+        self.version = None  # Ledger version the index is up to date with
+        self._trigram_index = None
+
+    @classmethod
+    def build(cls, expenses_df, version=None, **kwargs):
+        """Index every row of the ledger."""
+        index = cls(**kwargs)
+        token_codes, ids, vocabulary = cls._postings(expenses_df['ID'].to_numpy(), expenses_df['Title'])
+        index._set_main(vocabulary, token_codes, ids)
+        index.version = version
+        return index
+
+    def add(self, ids, titles):
+        """Index new or updated rows; updated rows must be removed first."""
+        for expense_id, title in zip(ids, titles):
+            tokens = list(dict.fromkeys(title_tokens(title))) if isinstance(title, str) else []
+            self.delta_tokens[int(expense_id)] = tokens
+            for token in tokens:
+                self.delta.setdefault(token, set()).add(int(expense_id))
+        self._compact_if_needed()
+
+    def remove(self, ids):
+        """Remove rows from the index."""
+        for expense_id in ids:
+            expense_id = int(expense_id)
+            for token in self.delta_tokens.pop(expense_id, []):
+                self.delta[token].discard(expense_id)
+                if not self.delta[token]:
+                    del self.delta[token]
+            self.stale_ids.add(expense_id)
+        self._compact_if_needed()
+
+    def apply_change(self, change, updated_df, version):
+        """
+        Apply a saved ledger change (see LedgerStore.apply_change) that produced `version`.
+
+        Changes are applied one version at a time, so an index at any other version than
+        the change's previous one is stale; it is left alone and False is returned.
+        `updated_df` is the ledger with the change applied.
+        """
+        if self.version != version - 1:
+            return False
+        if change['op'] == 'append':
+            self.add(change['rows']['ID'], change['rows']['Title'])
+        elif change['op'] == 'update':
+            if 'Title' in change['rows'].columns:
+                ids = change['rows']['ID']
+                self.remove(ids)
+                rows = updated_df[updated_df['ID'].isin(ids)]
+                self.add(rows['ID'], rows['Title'])
+        else:
+            self.remove(change['ids'])
+        self.version = version
+        return True
+
+    def search(self, query, fuzzy=False):
+        """
+        Return the sorted IDs of rows matching every word of `query`.
+
+        Each word matches title tokens that start with it; with `fuzzy`, tokens that are
+        spelled similarly (trigram similarity of at least `fuzzy_threshold`) match as well.
+        Returns None when no word of `query` is searchable (only digits, punctuation, noise
+        tokens or single letters), so callers leave their rows unfiltered.
+        """
+        result = None
+        for term in title_tokens(query):
+            ids = self._lookup(term, fuzzy)
+            result = ids if result is None else np.intersect1d(result, ids, assume_unique=True)
+            if not len(result):
+                break
+        return result
+
+    def _lookup(self, term, fuzzy):
+        """Sorted IDs of the rows with a token matching a single search term."""
+        # Tokens with the prefix are one contiguous block of the sorted vocabulary
+        start = bisect_left(self.tokens, term)
+        end = bisect_left(self.tokens, term + '\uffff')
+        parts = [self.posting_ids[self.posting_offsets[start]:self.posting_offsets[end]]]
+        if fuzzy:
+            parts.extend(self.posting_ids[self.posting_offsets[code]:self.posting_offsets[code + 1]]
+                         for code in self._similar_tokens(term))
+        if self.stale_ids:
+            stale = np.fromiter(self.stale_ids, dtype=np.int64, count=len(self.stale_ids))
+            parts = [part[~np.isin(part, stale)] for part in parts]
+
+        if self.delta:
+            term_trigrams = _trigrams(term) if fuzzy else None
+            for token, ids in self.delta.items():
+                if token.startswith(term) or (fuzzy and self._similarity(term_trigrams, _trigrams(token)) >= self.fuzzy_threshold):
+                    parts.append(np.fromiter(ids, dtype=np.int64, count=len(ids)))
+        return np.unique(np.concatenate(parts))
+
+    def _similar_tokens(self, term):
+        """Codes of main vocabulary tokens whose trigram similarity to `term` is above the threshold."""
+        if self._trigram_index is None:
+            self._build_trigram_index()
+        trigram_codes, offsets, token_codes, trigram_counts = self._trigram_index
+
+        term_trigrams = _trigrams(term)
+        candidates = [token_codes[offsets[code]:offsets[code + 1]]
+                      for code in (trigram_codes.get(trigram) for trigram in term_trigrams) if code is not None]
+        if not candidates:
+            return np.zeros(0, dtype=np.int64)
+        codes, shared = np.unique(np.concatenate(candidates), return_counts=True)
+        similarity = shared / (len(term_trigrams) + trigram_counts[codes] - shared)
+        return codes[similarity >= self.fuzzy_threshold]
+
+    def _build_trigram_index(self):
+        """Index the main vocabulary by trigram; built on the first fuzzy search."""
+        token_trigrams = [_trigrams(token) for token in self.tokens]
+        trigram_counts = np.fromiter((len(t) for t in token_trigrams), dtype=np.int64, count=len(token_trigrams))
+        trigram_of_pair, trigrams = pd.factorize(pd.Series([trigram for t in token_trigrams for trigram in t], dtype=object))
+        token_of_pair = np.repeat(np.arange(len(self.tokens)), trigram_counts)
+
+        order = np.argsort(trigram_of_pair, kind='stable')
+        offsets = np.r_[0, np.cumsum(np.bincount(trigram_of_pair, minlength=len(trigrams)))]
+        trigram_codes = {trigram: code for code, trigram in enumerate(trigrams)}
+        self._trigram_index = (trigram_codes, offsets, token_of_pair[order], trigram_counts)
+
+    @staticmethod
+    def _similarity(a, b):
+        """Trigram similarity of two trigram sets (shared / total distinct)."""
+        shared = len(a & b)
+        return shared / (len(a) + len(b) - shared)
+
+    def _compact_if_needed(self):
+        """Merge the delta into the main index once it is large enough to slow lookups down."""
+        if len(self.delta_tokens) + len(self.stale_ids) < self.compact_at:
+            return
+        # Merge the vocabularies and renumber the existing postings, instead of re-sorting strings
+        vocabulary = sorted(set(self.tokens).union(self.delta))
+        new_code = {token: code for code, token in enumerate(vocabulary)}
+        old_to_new = np.fromiter((new_code[token] for token in self.tokens), dtype=np.int64, count=len(self.tokens))
+
+        token_of_posting = np.repeat(np.arange(len(self.tokens)), np.diff(self.posting_offsets))
+        keep = ~np.isin(self.posting_ids, np.fromiter(self.stale_ids, dtype=np.int64, count=len(self.stale_ids)))
+        delta_codes = [new_code[token] for token, ids in self.delta.items() for _ in ids]
+        delta_ids = [expense_id for ids in self.delta.values() for expense_id in ids]
+
+        token_codes = np.concatenate([old_to_new[token_of_posting[keep]], np.array(delta_codes, dtype=np.int64)])
+        ids = np.concatenate([self.posting_ids[keep], np.array(delta_ids, dtype=np.int64)])
+        self._set_main(vocabulary, token_codes, ids)
+        self.stale_ids, self.delta, self.delta_tokens = set(), {}, {}
+
+    def _set_main(self, vocabulary, token_codes, ids):
+        """Replace the main index with (token code, ID) postings over a sorted vocabulary."""
+        order = np.lexsort((ids, token_codes))
+        self.tokens = vocabulary
+        self.posting_ids = ids[order]
+        self.posting_offsets = np.r_[0, np.cumsum(np.bincount(token_codes, minlength=len(vocabulary)))].astype(np.int64)
+        self._trigram_index = None
+
+    @staticmethod
+    def _postings(ids, titles):
+        """
+        Return (token codes, IDs, sorted vocabulary) with one entry per distinct token of each row.
+
+        Only distinct titles are tokenized; rows are expanded to their title's tokens with NumPy.
+        """
+        title_codes, unique_titles = pd.factorize(titles.fillna('').astype(str))
+        title_token_lists = [list(dict.fromkeys(title_tokens(title))) for title in unique_titles]
+        lengths = np.fromiter((len(t) for t in title_token_lists), dtype=np.int64, count=len(title_token_lists))
+        token_codes, vocabulary = pd.factorize(
+            pd.Series([token for tokens in title_token_lists for token in tokens], dtype=object), sort=True
+        )
+
+        # Expand every row to the token codes of its title
+        starts = np.r_[0, np.cumsum(lengths)[:-1]]
+        row_lengths = lengths[title_codes]
+        row_starts = np.repeat(starts[title_codes], row_lengths)
+        within = np.arange(row_lengths.sum()) - np.repeat(np.cumsum(row_lengths) - row_lengths, row_lengths)
+        return token_codes[row_starts + within], np.repeat(ids.astype(np.int64), row_lengths), list(vocabulary)
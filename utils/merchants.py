@@ -0,0 +1,33 @@
+import re
+import pandas as pd
+import numpy as np
+
+# Tokens that vary between statements of the same merchant
+MERCHANT_NOISE = {'com', 'www', 'sg', 'sgp', 'singapore', 'pte', 'ltd', 'inc', 'co', 'llc', 'the'}
+
+
+def title_tokens(title):
+    """Lowercase words of a title without digits, punctuation, noise tokens or single letters."""
+    return [t for t in re.sub(r'[^a-z]+', ' ', title.lower()).split() if t not in MERCHANT_NOISE and len(t) > 1]
+
+
+def normalize_title(title):
+    """Lowercase, drop digits/punctuation and noise tokens, keep the first three words."""
+    return ' '.join(title_tokens(title)[:3])
+
+
+def factorize_merchants(titles):
+    """
+    Return (codes, merchants) like pd.factorize over normalized titles.
+    Only unique titles are normalized, so this stays cheap on large ledgers.
+    """
+    title_codes, unique_titles = pd.factorize(titles.fillna('').astype(str))
+    normalized = np.array([normalize_title(title) for title in unique_titles], dtype=object)
+    merchant_of_title, merchants = pd.factorize(normalized)
+    return merchant_of_title[title_codes], np.asarray(merchants, dtype=object)
+
+
+def normalize_merchants(titles):
+    """Reduce titles to a merchant key, e.g. 'NETFLIX.COM SINGAPORE' -> 'netflix'."""
+    codes, merchants = factorize_merchants(titles)
+    return pd.Series(merchants[codes], index=titles.index, dtype=object)
@@ -1,7 +1,15 @@
-import pymupdf4llm
+import hashlib
+import re
 from datetime import datetime
 import streamlit as st
 import pandas as pd
+import numpy as np
+from utils.fx_rates import BASE_CURRENCY, CURRENCY_CODES
+
+# Original currency and amount of a foreign charge, e.g. 'USD 33.50', or 'USD (33.50)' for a refund, at the end of a line
+FOREIGN_AMOUNT = re.compile(r'\b([A-Z]{3})\s+(\(|-)?([\d,]+\.\d{2})\)?\s*$')
+# Fee lines the bank adds for a charge made in another currency
+CONVERSION_FEE = re.compile(r'ccy conversion|conversion fee|foreign transaction fee', re.IGNORECASE)
 
 class PDFProcessor:
     """Handles PDF processing and expense extraction."""
@@ -28,7 +36,11 @@ class PDFProcessor:
             'Banking': ['fee', 'charge', 'interest', 'transfer', 'atm', 'overdraft', 'conversion fee'],
             'Other': ['ccy conversion']
         }
-        self.current_year = datetime.now().year  
+        # Compile each category's keywords into one pattern up front; instances are shared via get_pdf_processor
+        self.category_patterns = {
+            category: re.compile('|'.join(re.escape(keyword) for keyword in keywords))
+            for category, keywords in self.categories.items() if keywords
+        }
     
     def categorize_expense(self, title):
         """
@@ -36,15 +48,72 @@ class PDFProcessor:
         """
         title_lower = title.lower()
         
-        for category, keywords in self.categories.items():
-            if any(keyword in title_lower for keyword in keywords):
+        for category, pattern in self.category_patterns.items():
+            if pattern.search(title_lower):
                 return category
         
         return 'Other'
+    
+    def categorize_series(self, titles, learned_categorizer=None, min_confidence=0.6):
+        """
+        Vectorized categorize_expense over a Series of titles; the first matching category wins.
         
-    def extract_expenses_from_pdf(self, uploaded_file):
+        Titles no keyword matches are predicted by `learned_categorizer` in one batch when
+        given, and keep 'Other' unless the prediction is at least `min_confidence` sure.
+        """
+        titles_lower = titles.fillna('').astype(str).str.lower()
+        conditions = [
+            titles_lower.str.contains(pattern, regex=True).to_numpy()
+            for pattern in self.category_patterns.values()
+        ]
+        categories = pd.Series(np.select(conditions, list(self.category_patterns.keys()), default='Other'),
+                               index=titles.index, dtype=object)
+        
+        unmatched = ~np.logical_or.reduce(conditions) if conditions else np.ones(len(titles), dtype=bool)
+        if learned_categorizer is not None and unmatched.any():
+            predicted, confidence = learned_categorizer.predict(titles[unmatched])
+            confident = confidence >= min_confidence
+            categories.loc[confident.index[confident]] = predicted[confident]
+        return categories
+        
+    def parse_foreign_amount(self, text):
+        """
+        Return (currency, amount) for text ending in a foreign currency amount, else (None, None).
+        """
+        match = FOREIGN_AMOUNT.search(text.strip())
+        if not match or match.group(1) not in CURRENCY_CODES or match.group(1) == BASE_CURRENCY:
+            return None, None
+        amount = float(match.group(3).replace(',', ''))
+        return match.group(1), -amount if match.group(2) else amount
+    
+    def link_conversion_fees(self, expenses_df):
+        """
+        Link each conversion fee row to the foreign charge it was added for.
+        
+        Banks list the fee right after its charge, so each fee gets the closest earlier row with an
+        original currency as its `Parent Row`, and takes that charge's category.
+        """
+        is_fee = expenses_df['Title'].fillna('').str.contains(CONVERSION_FEE).to_numpy()
+        foreign_rows = np.flatnonzero(expenses_df['Original Currency'].notna().to_numpy() & ~is_fee)
+        fee_rows = np.flatnonzero(is_fee)
+        
+        parent_rows = pd.array([pd.NA] * len(expenses_df), dtype='Int64')
+        if len(foreign_rows) and len(fee_rows):
+            nearest = np.searchsorted(foreign_rows, fee_rows) - 1
+            fee_rows, parents = fee_rows[nearest >= 0], foreign_rows[nearest[nearest >= 0]]
+            parent_rows[fee_rows] = expenses_df['Row'].to_numpy()[parents]
+            categories = expenses_df['Category'].to_numpy().copy()
+            categories[fee_rows] = categories[parents]
+            expenses_df['Category'] = categories
+        expenses_df['Parent Row'] = parent_rows
+        return expenses_df
+    
+    def extract_expenses_from_pdf(self, uploaded_file, learned_categorizer=None):
         """
         Extract expenses from uploaded PDF - wrapper for your original extract method.
+        
+        Titles the keyword rules don't recognize are categorized by `learned_categorizer`, if given.
+        Foreign charges keep their original currency and amount, and conversion fees are linked to them.
         """
         try:
             print(f'EXTRACTING...')
@@ -59,14 +128,21 @@ class PDFProcessor:
             # Convert to list of dictionaries and add categories
             expenses = []
             if df is not None and not df.empty:
-                for _, row in df.iterrows():
+                # Categorize the whole statement in one batch
+                categories = self.categorize_series(df['title'], learned_categorizer)
+                for position, ((_, row), category) in enumerate(zip(df.iterrows(), categories)):
                     expense = {
                         'Date': row['date'].date() if hasattr(row['date'], 'date') else row['date'],
                         'Title': row['title'],
                         'Amount': row['amount'],
-                        'Category': self.categorize_expense(row['title'])
+                        'Category': category,
+                        'Currency': BASE_CURRENCY,
+                        'Original Currency': row['original_currency'],
+                        'Original Amount': row['original_amount'],
+                        'Row': position
                     }
                     expenses.append(expense)
+                expenses = self.link_conversion_fees(pd.DataFrame(expenses)).to_dict(orient='records')
             
             return expenses
             
@@ -86,18 +162,27 @@ class PDFProcessor:
         """
         Your original extract method - keeping it exactly as you wrote it, with minor fixes.
         """
+        # Imported on first use; it is slow to load and only needed once a statement is uploaded
+        import pymupdf4llm
+        
         markdown = pymupdf4llm.to_markdown(file_path)  # Use the file_path parameter
+        # Statement lines only carry day and month; taken per call, as processors live as long as the server
+        current_year = datetime.now().year
         start = False
         titles = []
         amounts = []
         date_raw = []
+        original_currencies = []
+        original_amounts = []
+        # Whether the previous line was a charge that may have its original amount on this one
+        foreign_pending = False
         
         for line in markdown.split('\n'):
             if 'KOK CHUN SHEN' in line:
                 start = True
             if start:
                 try:
-                    dt = datetime.strptime(f"{line[:7]} {self.current_year}", "%d %b %Y")
+                    dt = datetime.strptime(f"{line[:7]} {current_year}", "%d %b %Y")
                     expense = line.split()[-1]
                     title = ' '.join(line[7:].split()[:-1])
                     if '(' in expense:
@@ -105,18 +190,43 @@ class PDFProcessor:
                     titles.append(title)
                     amounts.append(float(expense))
                     date_raw.append(dt)      
+                    # Foreign charges may end their title with the original amount...
+                    currency, original_amount = self.parse_foreign_amount(title)
+                    original_currencies.append(currency)
+                    original_amounts.append(original_amount)
+                    foreign_pending = currency is None
                 except:
-                    pass
+                    # ...or show it on the line directly below the charge
+                    currency, original_amount = self.parse_foreign_amount(line)
+                    if currency and foreign_pending:
+                        original_currencies[-1] = currency
+                        original_amounts[-1] = original_amount
+                    foreign_pending = False
         
         # Move assertions outside the loop
         if titles and amounts and date_raw:
             assert len(titles) == len(amounts)
             assert len(amounts) == len(date_raw)
             
-            df = pd.DataFrame({"date": date_raw, "title": titles, "amount": amounts})
+            df = pd.DataFrame({"date": date_raw, "title": titles, "amount": amounts,
+                               "original_currency": original_currencies, "original_amount": original_amounts})
             return df
         else:
-            return pd.DataFrame(columns=["date", "title", "amount"])
+            return pd.DataFrame(columns=["date", "title", "amount", "original_currency", "original_amount"])
         
         # Return empty dataframe for non-Citibank files
-        return pd.DataFrame(columns=["date", "title", "amount"])
\ No newline at end of file
+        return pd.DataFrame(columns=["date", "title", "amount", "original_currency", "original_amount"])
+
+
+# Hash of this module's source. Streamlit keys cached functions on their own source only,
+# so this makes an edit to the category rules build a new shared processor.
+with open(__file__, 'rb') as f:
+    RULES_VERSION = hashlib.sha256(f.read()).hexdigest()
+
+def get_pdf_processor():
+    """Get the PDFProcessor shared by all sessions, built once per server process and category rules."""
+    return _build_pdf_processor(RULES_VERSION)
+
+@st.cache_resource(max_entries=1)
+def _build_pdf_processor(rules_version):
+    return PDFProcessor()
@@ -0,0 +1,109 @@
+import pandas as pd
+import numpy as np
+from utils.merchants import factorize_merchants
+
+
+class RecurringDetector:
+    """Finds recurring charges and subscriptions in the confirmed ledger."""
+
+    def __init__(self, min_charges=3, regularity=0.7, amount_tolerance=0.2):
+        # (name, typical interval in days, allowed deviation in days)
+        self.periods = [
+            ('Weekly', 7, 2),
+            ('Monthly', 30.44, 5),
+            ('Quarterly', 91.31, 10),
+            ('Yearly', 365.25, 20),
+        ]
+        self.min_charges = min_charges
+        self.regularity = regularity
+        self.amount_tolerance = amount_tolerance
+
+    def detect(self, expenses_df):
+        """
+        Detect recurring charges in a ledger with Date, Title, Amount and Category columns.
+
+        Returns a DataFrame with one row per recurring merchant, sorted by monthly cost.
+        """
+        columns = ['Merchant', 'Category', 'Period', 'Interval (days)', 'Amount', 'Charges',
+                   'Last Charge', 'Next Expected', 'Monthly Cost', 'Active']
+        if expenses_df.empty:
+            return pd.DataFrame(columns=columns)
+
+        # Group on integer merchant codes; string keys make every groupby much slower
+        merchant_codes, merchant_names = factorize_merchants(expenses_df['Title'])
+        category_codes, category_names = pd.factorize(expenses_df['Category'].fillna('Other'))
+        df = pd.DataFrame({
+            'Merchant': merchant_codes,
+            'Date': pd.to_datetime(expenses_df['Date']).to_numpy(),
+            'Amount': expenses_df['Amount'].astype(float).to_numpy(),
+            'Category': category_codes,
+        })
+        df = df[merchant_names[merchant_codes] != ''].sort_values(['Merchant', 'Date'], kind='stable')
+
+        grouped = df.groupby('Merchant', sort=False)
+        df['Interval'] = grouped['Date'].diff().dt.days
+        charges = grouped['Date'].transform('size')
+        df = df[charges >= self.min_charges]
+        if df.empty:
+            return pd.DataFrame(columns=columns)
+
+        # Regular intervals: most gaps close to the merchant's median gap
+        grouped = df.groupby('Merchant', sort=False)
+        median_interval = grouped['Interval'].transform('median')
+        period_days, tolerance = self._match_period(median_interval.to_numpy())
+        df['On Schedule'] = np.abs(df['Interval'] - median_interval) <= tolerance
+        # Stable amounts: most charges close to the merchant's median amount
+        median_amount = grouped['Amount'].transform('median')
+        df['Stable Amount'] = np.abs(df['Amount'] - median_amount) <= self.amount_tolerance * median_amount.abs()
+        df['Period Days'] = period_days
+
+        summary = df.groupby('Merchant', sort=False).agg(
+            Category=('Category', 'last'),
+            Interval=('Interval', 'median'),
+            Period_Days=('Period Days', 'first'),
+            Amount=('Amount', 'median'),
+            Charges=('Amount', 'size'),
+            On_Schedule=('On Schedule', 'sum'),
+            Stable_Amount=('Stable Amount', 'mean'),
+            Last_Charge=('Date', 'max'),
+        )
+        # The first charge of each merchant has no interval to be on schedule with
+        recurring = (
+            summary['Period_Days'].notna()
+            & (summary['On_Schedule'] >= self.regularity * (summary['Charges'] - 1))
+            & (summary['Stable_Amount'] >= self.regularity)
+        )
+        summary = summary[recurring]
+
+        period_names = {days: name for name, days, _ in self.periods}
+        latest = df['Date'].max()
+        result = pd.DataFrame({
+            'Merchant': merchant_names[summary.index],
+            'Category': np.asarray(category_names, dtype=object)[summary['Category'].to_numpy()],
+            'Period': summary['Period_Days'].map(period_names).to_numpy(),
+            'Interval (days)': summary['Interval'].to_numpy(),
+            'Amount': summary['Amount'].round(2).to_numpy(),
+            'Charges': summary['Charges'].to_numpy(),
+            'Last Charge': summary['Last_Charge'].dt.date.to_numpy(),
+            'Next Expected': (summary['Last_Charge'] + pd.to_timedelta(summary['Interval'], unit='D')).dt.date.to_numpy(),
+            'Monthly Cost': (summary['Amount'] * 30.44 / summary['Period_Days']).round(2).to_numpy(),
+            # Still active unless a charge was missed by more than half a period
+            'Active': (summary['Last_Charge'] + pd.to_timedelta(summary['Period_Days'] * 1.5, unit='D') >= latest).to_numpy(),
+        })
+        return result.sort_values('Monthly Cost', ascending=False, ignore_index=True)
+
+    def monthly_recurring_cost(self, subscriptions):
+        """Projected monthly cost of the active recurring charges."""
+        if subscriptions.empty:
+            return 0.0
+        return float(subscriptions.loc[subscriptions['Active'], 'Monthly Cost'].sum())
+
+    def _match_period(self, intervals):
+        """Map median intervals to the closest known period, NaN where none fits."""
+        period_days = np.full(len(intervals), np.nan)
+        tolerance = np.full(len(intervals), np.nan)
+        for _, days, allowed in self.periods:
+            match = np.abs(intervals - days) <= allowed
+            period_days[match] = days
+            tolerance[match] = allowed
+        return period_days, tolerance
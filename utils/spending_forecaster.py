@@ -0,0 +1,84 @@
+import pandas as pd
+import numpy as np
+
+
+class SpendingForecaster:
+    """Projects next month's spending per category from the monthly totals.
+
+    Every category is fitted at once on a (categories x months) matrix: simple
+    exponential smoothing with the smoothing factor picked from a grid, and a
+    seasonal naive model (same month last year) once a year of history exists.
+    Per category, the model with the lower one-step-ahead error is used.
+    """
+
+    def __init__(self, alphas=None, season_length=12):
+        self.alphas = np.asarray(alphas if alphas is not None else np.linspace(0.05, 1.0, 20))
+        self.season_length = season_length
+
+    def monthly_totals(self, expenses_df):
+        """Total spending per category (rows) and calendar month (columns), with empty months as 0."""
+        months = pd.to_datetime(expenses_df['Date']).dt.to_period('M')
+        totals = expenses_df['Amount'].groupby([expenses_df['Category'].fillna('Other'), months]).sum().unstack(fill_value=0.0)
+        # Months without any spending still count as months
+        all_months = pd.period_range(totals.columns.min(), totals.columns.max(), freq='M')
+        return totals.reindex(columns=all_months, fill_value=0.0)
+
+    def forecast(self, expenses_df):
+        """
+        Forecast the month after the latest month in the ledger.
+
+        Returns a DataFrame with Category, Month, Forecast, Last Month, Model and MAE
+        (mean absolute one-step-ahead error of the chosen model).
+        """
+        columns = ['Category', 'Month', 'Forecast', 'Last Month', 'Model', 'MAE']
+        if expenses_df.empty:
+            return pd.DataFrame(columns=columns)
+
+        totals = self.monthly_totals(expenses_df)
+        series = totals.to_numpy(dtype=float)
+        n_months = series.shape[1]
+
+        ses_forecast, ses_error, best_alpha = self._fit_exponential_smoothing(series)
+        forecast = ses_forecast
+        error = ses_error
+        model = np.array([f'Exponential smoothing (alpha={alpha:.2f})' for alpha in best_alpha], dtype=object)
+
+        if n_months > self.season_length:
+            # Seasonal naive: each month repeats the same month one season earlier
+            seasonal_error = np.abs(series[:, self.season_length:] - series[:, :-self.season_length]).mean(axis=1)
+            seasonal_forecast = series[:, n_months - self.season_length]
+            use_seasonal = seasonal_error < ses_error
+            forecast = np.where(use_seasonal, seasonal_forecast, ses_forecast)
+            error = np.where(use_seasonal, seasonal_error, ses_error)
+            model[use_seasonal] = 'Seasonal naive'
+
+        return pd.DataFrame({
+            'Category': totals.index,
+            'Month': totals.columns[-1] + 1,
+            'Forecast': np.maximum(forecast, 0).round(2),
+            'Last Month': series[:, -1].round(2),
+            'Model': model,
+            'MAE': np.round(error, 2),
+        }).sort_values('Forecast', ascending=False, ignore_index=True)
+
+    def _fit_exponential_smoothing(self, series):
+        """
+        Fit simple exponential smoothing for every (alpha, category) pair at once.
+
+        Returns the next-month forecast, the mean absolute one-step error and the chosen
+        alpha per category.
+        """
+        n_categories, n_months = series.shape
+        # level[a, c] is the smoothed level for alpha a and category c
+        level = np.broadcast_to(series[:, 0], (len(self.alphas), n_categories)).copy()
+        abs_error = np.zeros_like(level)
+        alphas = self.alphas[:, None]
+        for month in range(1, n_months):
+            actual = series[:, month]
+            abs_error += np.abs(actual - level)
+            level += alphas * (actual - level)
+
+        mean_error = abs_error / max(n_months - 1, 1)
+        best = mean_error.argmin(axis=0)
+        categories = np.arange(n_categories)
+        return level[best, categories], mean_error[best, categories], self.alphas[best]